@@ -0,0 +1,63 @@
+"""Bill / purchase throughput: statement-per-commit vs. one batched transaction.
+
+Run from the repository root:  python -m benchmarks.bench_billing
+"""
+import argparse
+
+import db_config
+from utils import execute_query, create_bill, create_purchase
+from benchmarks.common import temp_database, timed
+
+
+def _run_unbatched(sql, params):
+    # The old execute_query: a fresh connection and a commit for every statement
+    conn = db_config.get_connection()
+    cur = conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+    return cur.lastrowid
+
+
+def create_bill_unbatched(customer_id, items):
+    total = sum(float(it["price"]) * int(it["quantity"]) for it in items)
+    bill_id = _run_unbatched(
+        "INSERT INTO bills (customer_id, total_amount, payment_status) VALUES (?, ?, 'unpaid')",
+        (customer_id, total))
+    for it in items:
+        _run_unbatched("INSERT INTO bill_items (bill_id, medicine_id, quantity, price) VALUES (?, ?, ?, ?)",
+                       (bill_id, it["medicine_id"], int(it["quantity"]), float(it["price"])))
+        _run_unbatched("UPDATE inventory SET current_stock = current_stock - ? WHERE product_id = ?",
+                       (int(it["quantity"]), it["medicine_id"]))
+    return bill_id
+
+
+def seed(products: int):
+    execute_query("INSERT INTO customers (name) VALUES ('Walk-in')")
+    execute_query("INSERT INTO suppliers (name) VALUES ('Bench Supplier')")
+    execute_query("INSERT INTO products (id, name, product_mrp) VALUES (?, ?, ?)",
+                  [(f"M{i:03d}", f"Medicine {i}", 10.0) for i in range(1, products + 1)], many=True)
+    execute_query("UPDATE inventory SET current_stock = 1000000")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bills", type=int, default=200)
+    parser.add_argument("--lines", type=int, default=20, help="line items per bill")
+    args = parser.parse_args()
+
+    items = [{"medicine_id": f"M{i:03d}", "quantity": 1, "price": 10.0} for i in range(1, args.lines + 1)]
+    results = []
+    with temp_database():
+        seed(args.lines)
+        results.append(("create_bill (unbatched)", timed(lambda: create_bill_unbatched(1, items), args.bills)))
+        results.append(("create_bill", timed(lambda: create_bill(1, items), args.bills)))
+        results.append(("create_purchase", timed(lambda: create_purchase(1, items), args.bills)))
+
+    print(f"{args.bills} documents x {args.lines} lines")
+    print(f"{'variant':<26}{'total (s)':>12}{'docs/sec':>12}")
+    for name, elapsed in results:
+        print(f"{name:<26}{elapsed:>12.3f}{args.bills / elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
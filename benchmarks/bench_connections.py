@@ -0,0 +1,50 @@
+"""Per-query overhead: fresh connection per call vs. the pooled thread connection.
+
+Run from the repository root:  python -m benchmarks.bench_connections
+"""
+import argparse
+
+import db_config
+from utils import fetch_one, execute_query
+from benchmarks.common import temp_database, timed
+
+
+def fetch_one_unpooled(query, params=()):
+    # The pre-pool behaviour of execute_query: connect, pragma, query, commit, close
+    conn = db_config.get_connection()
+    conn.row_factory = lambda cursor, row: {
+        col[0]: row[idx] for idx, col in enumerate(cursor.description)
+    }
+    cur = conn.cursor()
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.commit()
+    conn.close()
+    return rows[0] if rows else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=5000, help="queries per variant")
+    args = parser.parse_args()
+
+    with temp_database():
+        execute_query(
+            "INSERT INTO products (id, name, category, product_mrp) VALUES (?, ?, ?, ?)",
+            [(f"M{i:03d}", f"Medicine {i}", "General", i * 1.5) for i in range(1, 501)],
+            many=True,
+        )
+        sql = "SELECT id, name, product_mrp FROM products WHERE id = ?"
+
+        before = timed(lambda: fetch_one_unpooled(sql, ("M250",)), args.n)
+        db_config.open_pool()
+        after = timed(lambda: fetch_one(sql, ("M250",)), args.n)
+
+    print(f"{'variant':<22}{'total (s)':>12}{'per query (us)':>18}")
+    print(f"{'connect per call':<22}{before:>12.3f}{before / args.n * 1e6:>18.1f}")
+    print(f"{'pooled connection':<22}{after:>12.3f}{after / args.n * 1e6:>18.1f}")
+    print(f"speed-up: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Bulk product import throughput (rows per minute), first load and a re-import of the same file.
+
+Run from the repository root:  python -m benchmarks.bench_import
+"""
+import argparse
+import csv
+import os
+import random
+
+import importer
+from benchmarks.common import temp_database
+from benchmarks.datagen import product_rows
+
+HEADER = ["ID", "Name", "Category", "Manufacturer", "Batch Number", "MRP", "Purchase Price", "Expiry"]
+
+
+def write_price_list(path: str, rows: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(product_rows(rows, random.Random(7)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40_000, 200_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}  {'run':<10}{'seconds':>10}{'rows/min':>14}")
+    for size in args.sizes:
+        with temp_database() as db_file:
+            path = os.path.join(os.path.dirname(db_file), "price_list.csv")
+            write_price_list(path, size)
+            for run in ("insert", "upsert"):
+                result = importer.import_file("products", path)
+                print(f"{size:>10}  {run:<10}{result['seconds']:>10.2f}"
+                      f"{result['imported'] / result['seconds'] * 60:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare db_config performance profiles on a mixed counter + reporting workload.
+
+A writer thread rings up bills through utils.create_bill while a reader thread
+runs a sales aggregate on its own connection, both for a fixed duration.
+
+Run from the repository root:  python -m benchmarks.bench_profiles
+"""
+import argparse
+import threading
+import time
+
+import db_config
+from utils import create_bill
+from benchmarks.common import temp_database
+from benchmarks.bench_billing import seed
+
+# (writer profile, reader profile)
+SCENARIOS = [
+    ("compat", "compat"),
+    ("pos-safe", "pos-safe"),
+    ("pos-safe", "read-only-report"),
+    ("bulk-import", "bulk-import"),
+]
+
+REPORT_SQL = """
+    SELECT bi.medicine_id, SUM(bi.quantity) AS qty, SUM(bi.quantity * bi.price) AS revenue
+    FROM bill_items bi JOIN bills b ON b.id = bi.bill_id
+    GROUP BY bi.medicine_id ORDER BY revenue DESC LIMIT 10
+"""
+
+
+def run_scenario(writer_profile, reader_profile, duration, history):
+    items = [{"medicine_id": f"M{i:03d}", "quantity": 1, "price": 10.0} for i in range(1, 11)]
+    with temp_database():
+        db_config.set_profile(writer_profile)
+        seed(50)
+        for _ in range(history):
+            create_bill(1, items)
+
+        stop = time.perf_counter() + duration
+        counts = {"bills": 0, "reports": 0}
+        worst = {"write": 0.0}
+
+        def writer():
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                create_bill(1, items)
+                worst["write"] = max(worst["write"], time.perf_counter() - t0)
+                counts["bills"] += 1
+
+        def reader():
+            conn = db_config.get_connection(profile=reader_profile)
+            while time.perf_counter() < stop:
+                conn.execute(REPORT_SQL).fetchall()
+                counts["reports"] += 1
+            conn.close()
+
+        threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return counts["bills"] / duration, counts["reports"] / duration, worst["write"] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per scenario")
+    parser.add_argument("--history", type=int, default=2000, help="bills created before measuring")
+    args = parser.parse_args()
+
+    print(f"{'writer / reader':<34}{'bills/s':>10}{'reports/s':>12}{'worst write (ms)':>18}")
+    for writer_profile, reader_profile in SCENARIOS:
+        bills, reports, worst = run_scenario(writer_profile, reader_profile, args.duration, args.history)
+        label = f"{writer_profile} / {reader_profile}"
+        print(f"{label:<34}{bills:>10.1f}{reports:>12.1f}{worst:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
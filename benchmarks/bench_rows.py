@@ -0,0 +1,55 @@
+"""Row materialisation cost for a large fetch_all: per-row dict vs. Record vs. raw tuples.
+
+Run from the repository root:  python -m benchmarks.bench_rows
+"""
+import argparse
+import sqlite3
+
+import db_config
+from utils import execute_query, fetch_all
+from benchmarks.common import temp_database, timed
+
+SQL = "SELECT id, name, category, product_mrp, product_expiry FROM products"
+
+
+def fetch_all_dicts():
+    # The old execute_query row factory
+    conn = db_config.get_thread_connection()
+    cur = conn.cursor()
+    cur.row_factory = lambda cursor, row: {col[0]: row[idx] for idx, col in enumerate(cursor.description)}
+    return cur.execute(SQL).fetchall()
+
+
+def fetch_all_sqlite_rows():
+    cur = db_config.get_thread_connection().cursor()
+    cur.row_factory = sqlite3.Row
+    return cur.execute(SQL).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with temp_database():
+        execute_query(
+            "INSERT INTO products (id, name, category, product_mrp) VALUES (?, ?, ?, ?)",
+            [(f"M{i:06d}", f"Medicine {i}", "General", i * 0.5) for i in range(args.rows)],
+            many=True,
+        )
+        variants = [
+            ("dict per row (old)", fetch_all_dicts),
+            ("sqlite3.Row", fetch_all_sqlite_rows),
+            ("Record", lambda: fetch_all(SQL)),
+            ("raw tuples", lambda: fetch_all(SQL, raw=True)),
+        ]
+        print(f"{args.rows} rows, best of {args.repeat}")
+        print(f"{'variant':<22}{'ms':>10}")
+        for name, fn in variants:
+            best = min(timed(fn) for _ in range(args.repeat))
+            print(f"{name:<22}{best * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
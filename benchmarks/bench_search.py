@@ -0,0 +1,47 @@
+"""Product search latency: six-column LIKE '%term%' scan vs. the FTS5 trigram index.
+
+Run from the repository root:  python -m benchmarks.bench_search
+"""
+import argparse
+import random
+
+from utils import execute_query, fetch_all, search_medicines
+from benchmarks.common import temp_database, timed
+from benchmarks.datagen import product_rows
+
+TERMS = ["paracetamol", "statin", "zole", "Lupin", "Cardiac", "B0042"]
+
+
+def search_like(term: str):
+    like = f"%{term}%"
+    return fetch_all("""
+        SELECT * FROM products
+        WHERE id LIKE ? OR name LIKE ? OR manufacturer LIKE ? OR category LIKE ? OR batch_number LIKE ?
+           OR product_expiry LIKE ?
+        ORDER BY name ASC
+        LIMIT 100
+    """, (like,) * 6)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50_000, 500_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'products':>10}  {'term':<14}{'LIKE (ms)':>12}{'FTS5 (ms)':>12}")
+    for size in args.sizes:
+        with temp_database():
+            execute_query(
+                "INSERT INTO products (id, name, category, manufacturer, batch_number, product_mrp, "
+                "product_price, product_expiry) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                list(product_rows(size, random.Random(42))), many=True,
+            )
+            for term in TERMS:
+                like = min(timed(lambda: search_like(term)) for _ in range(args.repeat))
+                fts = min(timed(lambda: search_medicines(term)) for _ in range(args.repeat))
+                print(f"{size:>10}  {term:<14}{like * 1000:>12.2f}{fts * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
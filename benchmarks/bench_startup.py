@@ -0,0 +1,104 @@
+"""Cold-start budget check: importing main, the schema check, and (with a display) the login screen.
+
+Each measurement runs in a fresh interpreter so nothing is already imported. Exits with
+status 1 if any median is over its budget, so it can gate a build.
+
+Run from the repository root:  python -m benchmarks.bench_startup
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+import db_config
+from benchmarks.common import temp_database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_MAIN = """
+import sys, time
+t = time.perf_counter()
+import main
+elapsed = time.perf_counter() - t
+eager = sorted(m for m in sys.modules if m.startswith("modules.") or m == "customtkinter")
+print(elapsed, ",".join(eager))
+"""
+
+INIT_DB = """
+import sys, time
+import db_config
+db_config.DB_FILE = sys.argv[1]
+t = time.perf_counter()
+db_config.init_db()
+print(time.perf_counter() - t)
+"""
+
+# Up to the login window being drawn; needs a display and the GUI dependencies
+LOGIN = """
+import sys, time
+t = time.perf_counter()
+import db_config
+db_config.DB_FILE = sys.argv[1]
+import main
+app = main.PharmacyApp()
+app.root.update()
+print(time.perf_counter() - t)
+app.root.destroy()
+"""
+
+
+def _run(code: str, *args: str) -> str:
+    out = subprocess.run([sys.executable, "-c", code, *args], cwd=ROOT, capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed")
+    return out.stdout.strip()
+
+
+def _median(code: str, repeat: int, *args: str) -> float:
+    return statistics.median(float(_run(code, *args).split()[0]) for _ in range(repeat))
+
+
+def _can_show_login() -> bool:
+    if sys.platform.startswith("linux") and not os.environ.get("DISPLAY"):
+        return False
+    try:
+        import customtkinter  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--import-budget", type=float, default=0.15, help="seconds to import main")
+    parser.add_argument("--init-budget", type=float, default=0.05, help="seconds for init_db on a current schema")
+    parser.add_argument("--login-budget", type=float, default=1.5, help="seconds until the login window is drawn")
+    args = parser.parse_args()
+
+    results = []  # (step, seconds, budget)
+    eager = _run(IMPORT_MAIN).partition(" ")[2]
+    results.append(("import main", _median(IMPORT_MAIN, args.repeat), args.import_budget))
+    with temp_database() as path:
+        # temp_database() already created and migrated it, as a previous launch would have
+        db_config.close_pool()
+        results.append(("init_db (current schema)", _median(INIT_DB, args.repeat, path), args.init_budget))
+        if _can_show_login():
+            results.append(("start to login window", _median(LOGIN, args.repeat, path), args.login_budget))
+        else:
+            print("start to login window: skipped (no display or customtkinter)")
+
+    failed = bool(eager)
+    if eager:
+        print(f"imported at startup, should be lazy: {eager}")
+    print(f"{'step':<28}{'median s':>10}{'budget s':>10}")
+    for step, seconds, budget in results:
+        over = seconds > budget
+        failed |= over
+        print(f"{step:<28}{seconds:>10.3f}{budget:>10.3f}{'  OVER BUDGET' if over else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Peak Python memory for reading a large table: fetch_all vs. iter_query.
+
+Run from the repository root:  python -m benchmarks.bench_streaming
+"""
+import argparse
+import tracemalloc
+
+from utils import execute_query, fetch_all, iter_query
+from benchmarks.common import temp_database, timed
+
+SQL = "SELECT id, name, category, product_mrp, product_expiry FROM products ORDER BY id"
+
+
+def peak_mib(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def consume(rows):
+    total = 0.0
+    for r in rows:
+        total += r[3]
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    args = parser.parse_args()
+
+    print(f"{'rows':>10}{'fetch_all MiB':>16}{'iter_query MiB':>16}{'fetch_all s':>13}{'iter_query s':>14}")
+    for size in args.sizes:
+        with temp_database():
+            execute_query(
+                "INSERT INTO products (id, name, category, product_mrp) VALUES (?, ?, ?, ?)",
+                [(f"M{i:07d}", f"Medicine {i}", "General", i * 0.25) for i in range(size)],
+                many=True,
+            )
+            eager = lambda: consume(fetch_all(SQL))
+            lazy = lambda: consume(iter_query(SQL))
+            print(f"{size:>10}{peak_mib(eager):>16.1f}{peak_mib(lazy):>16.1f}"
+                  f"{timed(eager):>13.3f}{timed(lazy):>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
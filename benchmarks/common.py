@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+import db_config
+import utils
+
+
+@contextmanager
+def temp_database():
+    """Point db_config at a fresh, initialised database file for the duration of a benchmark."""
+    tmpdir = tempfile.mkdtemp(prefix="phms-bench-")
+    old_file, old_profile = db_config.DB_FILE, db_config.DB_PROFILE
+    db_config.close_pool()
+    db_config.DB_FILE = os.path.join(tmpdir, "bench.db")
+    utils.clear_caches()
+    try:
+        db_config.init_db()
+        yield db_config.DB_FILE
+    finally:
+        db_config.close_pool()
+        utils.clear_caches()
+        db_config.DB_FILE = old_file
+        db_config.DB_PROFILE = old_profile
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def timed(fn, repeat: int = 1) -> float:
+    """Run fn() `repeat` times and return the elapsed wall time in seconds."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return time.perf_counter() - start
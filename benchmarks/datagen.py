@@ -0,0 +1,178 @@
+"""Deterministic synthetic pharmacy data at a configurable scale.
+
+The scale is the number of bill line items; every other table is sized from it.
+The same (scale, seed) always produces the same database.
+
+    python -m benchmarks.datagen --scale 100000 --db bench.db
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+import db_config
+
+SYLLABLES = ["para", "ceta", "mol", "amox", "cilin", "ibu", "pro", "fen", "ome", "pra", "zole",
+             "met", "for", "min", "ator", "va", "statin", "lora", "ta", "dine", "azi", "thro", "cin"]
+CATEGORIES = ["Pain Relief", "Antibiotic", "Supplements", "Digestive", "Allergy", "Diabetes", "Cardiac"]
+MAKERS = ["Cipla", "Sun Pharma", "Lupin", "Mankind", "Zydus", "Alkem", "Torrent"]
+FIRST = ["Aarav", "Diya", "Ishaan", "Meera", "Kabir", "Anaya", "Rohan", "Sara", "Vivaan", "Zoya"]
+LAST = ["Sharma", "Patel", "Iyer", "Khan", "Das", "Reddy", "Gupta", "Nair", "Singh", "Joshi"]
+
+LINES_PER_BILL = 5
+CHUNK = 20_000
+
+
+def sizes(scale: int) -> dict:
+    bills = max(1, scale // LINES_PER_BILL)
+    return {
+        "line_items": scale,
+        "bills": bills,
+        "products": min(100_000, max(1_000, scale // 100)),
+        "customers": max(500, bills // 20),
+        "suppliers": 50,
+        "doctors": 100,
+        "prescriptions": max(1, bills // 10),
+    }
+
+
+def product_id(i: int) -> str:
+    return f"M{i:06d}"
+
+
+def product_rows(n: int, rnd: random.Random):
+    for i in range(1, n + 1):
+        name = "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))).capitalize()
+        mrp = round(rnd.uniform(5, 500), 2)
+        expiry = f"{rnd.randint(2025, 2029)}-{rnd.randint(1, 12):02d}-28"
+        yield (product_id(i), f"{name} {rnd.choice([250, 500, 650])}mg", rnd.choice(CATEGORIES),
+               rnd.choice(MAKERS), f"B{rnd.randint(0, 99999):05d}", mrp, round(mrp * 0.8, 2), expiry)
+
+
+def _person(rnd: random.Random) -> str:
+    return f"{rnd.choice(FIRST)} {rnd.choice(LAST)}"
+
+
+def _chunks(rows, size: int = CHUNK):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(conn, sql: str, rows):
+    for batch in _chunks(rows):
+        conn.executemany(sql, batch)
+        conn.commit()
+
+
+def generate(scale: int, seed: int = 1, days: int = 365, progress=None) -> dict:
+    """Fill the (freshly initialised) database at db_config.DB_FILE; returns the table sizes."""
+    n = sizes(scale)
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    conn = db_config.get_connection(profile="bulk-import")
+    try:
+        _insert(conn, """
+            INSERT INTO products (id, name, category, manufacturer, batch_number, product_mrp,
+                                  product_price, product_expiry)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, product_rows(n["products"], rnd))
+        # Inventory rows are created by the products trigger; give them opening stock
+        _insert(conn, "UPDATE inventory SET current_stock = ?, minimum_stock = 20 WHERE product_id = ?",
+                ((rnd.randint(0, 500), product_id(i)) for i in range(1, n["products"] + 1)))
+        _insert(conn, "INSERT INTO customers (name, phone, email) VALUES (?, ?, ?)",
+                ((_person(rnd), f"9{rnd.randint(100000000, 999999999)}", f"c{i}@example.com")
+                 for i in range(n["customers"])))
+        _insert(conn, "INSERT INTO suppliers (name, contact_person, phone) VALUES (?, ?, ?)",
+                ((f"{rnd.choice(MAKERS)} Distributors {i}", _person(rnd), f"8{rnd.randint(100000000, 999999999)}")
+                 for i in range(n["suppliers"])))
+        _insert(conn, "INSERT INTO doctors (name, specialization) VALUES (?, ?)",
+                ((f"Dr. {_person(rnd)}", rnd.choice(["GP", "Cardiology", "Paediatrics", "ENT"]))
+                 for _ in range(n["doctors"])))
+        if progress:
+            progress("reference data")
+
+        # Bills with explicit ids so line items and payments can reference them without lookups
+        span = days * 86400
+
+        def bill_rows():
+            for bill_id in range(1, n["bills"] + 1):
+                when = start + timedelta(seconds=span * bill_id // n["bills"])
+                customer = rnd.randint(1, n["customers"]) if rnd.random() < 0.8 else None
+                yield (bill_id, customer, when.strftime("%Y-%m-%d %H:%M:%S"))
+
+        _insert(conn, "INSERT INTO bills (id, customer_id, bill_date, total_amount) VALUES (?, ?, ?, 0)",
+                bill_rows())
+
+        def item_rows():
+            for i in range(n["line_items"]):
+                bill_id = i // LINES_PER_BILL + 1
+                if bill_id > n["bills"]:
+                    bill_id = n["bills"]
+                yield (bill_id, product_id(rnd.randint(1, n["products"])), rnd.randint(1, 5),
+                       round(rnd.uniform(5, 500), 2))
+
+        _insert(conn, "INSERT INTO bill_items (bill_id, medicine_id, quantity, price) VALUES (?, ?, ?, ?)",
+                item_rows())
+        conn.execute("""
+            UPDATE bills SET total_amount = (
+                SELECT COALESCE(SUM(quantity * price), 0) FROM bill_items WHERE bill_id = bills.id
+            )
+        """)
+        conn.commit()
+        if progress:
+            progress("bills")
+
+        # ~90% of bills are paid in full, in one payment on the bill date
+        conn.execute("""
+            INSERT INTO payments (bill_id, amount, method, payment_date)
+            SELECT id, total_amount,
+                   CASE id % 4 WHEN 0 THEN 'cash' WHEN 1 THEN 'card' WHEN 2 THEN 'upi' ELSE 'insurance' END,
+                   bill_date
+            FROM bills WHERE id % 10 <> 0
+        """)
+        conn.execute("UPDATE bills SET payment_status = 'paid', paid_amount = total_amount WHERE id % 10 <> 0")
+        conn.commit()
+
+        _insert(conn, "INSERT INTO prescriptions (id, customer_id, doctor_id, notes) VALUES (?, ?, ?, '')",
+                ((i, rnd.randint(1, n["customers"]), rnd.randint(1, n["doctors"]))
+                 for i in range(1, n["prescriptions"] + 1)))
+        _insert(conn, """
+            INSERT INTO prescription_items (prescription_id, medicine_id, dosage, duration)
+            VALUES (?, ?, ?, ?)
+        """, ((i // 3 + 1, product_id(rnd.randint(1, n["products"])), "1-0-1", f"{rnd.randint(3, 14)} days")
+              for i in range(n["prescriptions"] * 3)))
+        # Rows went in underneath utils.create_bill / record_payment, so derive the rollups
+        # and bill numbers
+        db_config.rebuild_rollups(conn)
+        db_config.number_documents(conn)
+        conn.execute("ANALYZE")
+        conn.commit()
+        if progress:
+            progress("payments and prescriptions")
+    finally:
+        conn.close()
+    return n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=int, default=100_000, help="bill line items (10k .. 10M)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db", required=True, help="database file to create")
+    args = parser.parse_args()
+
+    db_config.DB_FILE = args.db
+    db_config.init_db()
+    t0 = time.perf_counter()
+    n = generate(args.scale, args.seed, progress=lambda step: print(f"  {step}: {time.perf_counter() - t0:.1f}s"))
+    print(f"Generated {n} into {args.db} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
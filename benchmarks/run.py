@@ -0,0 +1,149 @@
+"""Time the real utils operations against a synthetic database and write JSON results.
+
+    python -m benchmarks.run --scale 100000 --out results.json
+    python -m benchmarks.run --db bench.db --out results.json   # reuse a datagen database
+
+Compare two runs (e.g. before/after a commit) with --compare old.json.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import time
+
+import db_config
+import utils
+from benchmarks import datagen
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _table_count(table: str) -> int:
+    return utils.fetch_one(f"SELECT COUNT(*) AS n FROM {table}")["n"]
+
+
+def operations(rnd: random.Random):
+    """(name, callable) pairs; each callable performs one operation with fresh random arguments."""
+    products = _table_count("products")
+    customers = _table_count("customers")
+    suppliers = _table_count("suppliers")
+    unpaid = [r[0] for r in utils.fetch_all("SELECT id FROM bills WHERE payment_status <> 'paid' LIMIT 5000",
+                                            raw=True)]
+    terms = ["para", "statin", "zole", "Lupin", "cardiac", "amox"]
+
+    def lines(n):
+        return [{"medicine_id": datagen.product_id(rnd.randint(1, products)), "quantity": rnd.randint(1, 3),
+                 "price": round(rnd.uniform(5, 500), 2)} for _ in range(n)]
+
+    return [
+        ("create_bill", lambda: utils.create_bill(rnd.randint(1, customers), lines(datagen.LINES_PER_BILL))),
+        ("create_purchase", lambda: utils.create_purchase(rnd.randint(1, suppliers), lines(10), "bench")),
+        ("record_payment", lambda: utils.record_payment(rnd.choice(unpaid) if unpaid else 1, 1.0, "cash")),
+        ("get_last_bill", lambda: utils.get_last_bill(rnd.randint(1, customers))),
+        ("get_customer_bills", lambda: utils.get_customer_bills(rnd.randint(1, customers))),
+        ("search_medicines", lambda: utils.search_medicines(rnd.choice(terms))),
+    ]
+
+
+def measure(fn, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "p50_ms": round(samples[len(samples) // 2], 4),
+        "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 4),
+        "max_ms": round(samples[-1], 4),
+        "ops_per_sec": round(1000 * len(samples) / sum(samples), 1),
+    }
+
+
+def run(iterations: int, seed: int) -> dict:
+    rnd = random.Random(seed)
+    results = {}
+    for name, fn in operations(rnd):
+        fn()  # warm caches and statement cache
+        results[name] = measure(fn, iterations)
+        print(f"  {name:<20}{results[name]['mean_ms']:>10.3f} ms  p95 {results[name]['p95_ms']:.3f} ms")
+    return results
+
+
+def compare(old: dict, new: dict):
+    print(f"{'operation':<20}{'old ms':>10}{'new ms':>10}{'change':>10}")
+    for name, res in new["results"].items():
+        before = old["results"].get(name)
+        if not before:
+            continue
+        change = (res["mean_ms"] - before["mean_ms"]) / before["mean_ms"] * 100 if before["mean_ms"] else 0.0
+        print(f"{name:<20}{before['mean_ms']:>10.3f}{res['mean_ms']:>10.3f}{change:>+9.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=int, default=100_000, help="line items to generate when --db is not given")
+    parser.add_argument("--db", help="existing datagen database (copied, never modified)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="previous results JSON to diff against")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="phms-bench-")
+    db_file = os.path.join(tmpdir, "bench.db")
+    try:
+        if args.db:
+            shutil.copyfile(args.db, db_file)
+            db_config.DB_FILE = db_file
+            db_config.init_db()
+            scale = None
+        else:
+            db_config.DB_FILE = db_file
+            db_config.init_db()
+            print(f"Generating scale={args.scale} ...")
+            datagen.generate(args.scale, args.seed)
+            scale = args.scale
+        db_config.open_pool()
+        # Enough stock on the copy that create_bill never hits InsufficientStockError
+        utils.execute_query("UPDATE inventory SET current_stock = current_stock + 1000000")
+        results = run(args.iterations, args.seed)
+    finally:
+        db_config.close_pool()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "profile": db_config.DB_PROFILE,
+        "scale": scale,
+        "source_db": args.db,
+        "seed": args.seed,
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
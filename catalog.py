@@ -0,0 +1,147 @@
+"""In-memory index of the catalogue for the checkout counter: by id, by barcode, by name prefix.
+
+Loaded once per process, then kept current incrementally. sync() fetches only the products
+and stock rows stamped since the last sync (products.updated_at, inventory.last_updated),
+plus the list of product ids to drop deleted products, and a completed sale adjusts stock
+locally, so lookups never wait on the database.
+"""
+import bisect
+import threading
+from datetime import date
+from typing import Dict, List, Optional
+
+from utils import fetch_all, fetch_one
+
+_SELECT = """
+    SELECT p.id, p.name, p.barcode, p.product_mrp, p.product_expiry, COALESCE(i.current_stock, 0) AS stock
+    FROM products p LEFT JOIN inventory i ON i.product_id = p.id
+"""
+
+# A write stamped just before a sync can commit just after it; re-read that window next time
+_SYNC_OVERLAP = "-5 seconds"
+
+
+def _db_now() -> str:
+    return fetch_one("SELECT datetime('now','localtime') AS now")["now"]
+
+
+class ProductIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, dict] = {}
+        self._by_barcode: Dict[str, str] = {}
+        self._names: List[tuple] = []  # sorted (casefolded name, id)
+        self._synced_at: Optional[str] = None  # DB clock when the last load/sync started
+
+    @property
+    def loaded(self) -> bool:
+        return self._synced_at is not None
+
+    # ---------- loading ----------
+
+    def load(self) -> int:
+        """(Re)build the whole index; returns the number of products. Run on a DB worker."""
+        now = _db_now()
+        by_id = {r["id"]: dict(r.items()) for r in fetch_all(_SELECT)}
+        by_barcode = {e["barcode"]: e["id"] for e in by_id.values() if e["barcode"]}
+        names = sorted((e["name"].casefold(), e["id"]) for e in by_id.values())
+        with self._lock:
+            self._by_id, self._by_barcode, self._names = by_id, by_barcode, names
+            self._synced_at = now
+        return len(by_id)
+
+    def sync(self) -> int:
+        """Apply the products and stock changed since the last load/sync; returns how many rows were read."""
+        if not self.loaded:
+            return self.load()
+        now = _db_now()
+        rows = fetch_all(_SELECT + """
+            WHERE p.id IN (SELECT id FROM products WHERE updated_at >= datetime(?1, ?2)
+                           UNION SELECT product_id FROM inventory WHERE last_updated >= datetime(?1, ?2))
+        """, (self._synced_at, _SYNC_OVERLAP))
+        # Deletes leave no stamp behind: reconcile against the ids (an index-only scan)
+        ids = {r[0] for r in fetch_all("SELECT id FROM products", raw=True)}
+        with self._lock:
+            for r in rows:
+                self._put(dict(r.items()))
+            for product_id in [i for i in self._by_id if i not in ids]:
+                self._drop(product_id)
+            self._synced_at = now
+            missing = len(ids) != len(self._by_id)
+        if missing:
+            # A product committed with a stamp older than the sync window; rare, so just reload
+            return self.load()
+        return len(rows)
+
+    def _put(self, entry: dict):
+        self._drop(entry["id"])
+        self._by_id[entry["id"]] = entry
+        bisect.insort(self._names, (entry["name"].casefold(), entry["id"]))
+        if entry["barcode"]:
+            self._by_barcode[entry["barcode"]] = entry["id"]
+
+    def _drop(self, product_id: str):
+        old = self._by_id.pop(product_id, None)
+        if old is None:
+            return
+        i = bisect.bisect_left(self._names, (old["name"].casefold(), old["id"]))
+        if i < len(self._names) and self._names[i] == (old["name"].casefold(), old["id"]):
+            del self._names[i]
+        if old["barcode"] and self._by_barcode.get(old["barcode"]) == product_id:
+            del self._by_barcode[old["barcode"]]
+
+    # ---------- local updates ----------
+
+    def apply_sale(self, quantities: Dict[str, int]):
+        """Take a committed sale's quantities off the cached stock."""
+        with self._lock:
+            for product_id, qty in quantities.items():
+                entry = self._by_id.get(product_id)
+                if entry is not None:
+                    entry["stock"] = max(entry["stock"] - qty, 0)
+
+    def set_stock(self, product_id: str, stock: int):
+        with self._lock:
+            entry = self._by_id.get(product_id)
+            if entry is not None:
+                entry["stock"] = stock
+
+    # ---------- lookups ----------
+
+    def get(self, product_id: str) -> Optional[dict]:
+        return self._by_id.get(product_id)
+
+    def find_code(self, code: str) -> Optional[dict]:
+        """The product whose id or barcode is exactly `code` (ids case-insensitively)."""
+        code = code.strip()
+        with self._lock:
+            product_id = self._by_barcode.get(code) or code
+            return self._by_id.get(product_id) or self._by_id.get(product_id.upper())
+
+    def suggest(self, term: str, limit: int = 20) -> List[dict]:
+        """An exact id/barcode match first, then names starting with `term`; expired stock is left out."""
+        term = term.strip()
+        if not term:
+            return []
+        today = date.today().isoformat()
+        prefix = term.casefold()
+        out, seen = [], set()
+        exact = self.find_code(term)
+        if exact is not None and (exact["product_expiry"] or "") >= today:
+            out.append(exact)
+            seen.add(exact["id"])
+        with self._lock:
+            i = bisect.bisect_left(self._names, (prefix,))
+            while i < len(self._names) and len(out) < limit:
+                name, product_id = self._names[i]
+                if not name.startswith(prefix):
+                    break
+                entry = self._by_id[product_id]
+                if product_id not in seen and (entry["product_expiry"] or "") >= today:
+                    out.append(entry)
+                i += 1
+        return out
+
+
+# Process-wide index, loaded the first time a sales window needs it
+product_index = ProductIndex()
@@ -1,16 +1,160 @@
+import os
 import sqlite3
+import threading
+
+import query_stats
 
 DB_FILE = "medicines.db"
 
-def get_connection():
-    conn = sqlite3.connect(DB_FILE)
+# ---------- Performance profiles ----------
+# Applied as PRAGMAs to every new connection. Pick one with the PHMS_DB_PROFILE
+# environment variable or set_profile(); "compat" is the old rollback-journal behaviour.
+PROFILES = {
+    # Counter terminals: WAL so reports never block the cashier, full fsync on commit
+    "pos-safe": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,       # KiB (negative) => ~16 MB page cache
+        "mmap_size": 67108864,      # 64 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,       # ms
+    },
+    # Imports from the app's Import buttons, into the live database other counters are
+    # billing against: big cache, long wait for the write lock, but no fsync trade-off
+    # (NORMAL in WAL can lose the last commits on power loss, never corrupt the file)
+    "live-import": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -131072,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+    # Offline loads only (CLI, nothing else using the file): durability traded for speed.
+    # A crash mid-load can corrupt the database
+    "bulk-import": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -131072,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+    # Reporting connections: big cache and mmap, and refuse to write
+    "read-only-report": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,
+        "mmap_size": 268435456,
+        # No temp_store=MEMORY: large report GROUP BYs measured ~30% slower with it
+        "busy_timeout": 10000,
+        "query_only": "ON",
+    },
+    "compat": {
+        "journal_mode": "DELETE",
+        "synchronous": "FULL",
+        "busy_timeout": 5000,
+    },
+}
+
+DB_PROFILE = os.environ.get("PHMS_DB_PROFILE", "pos-safe")
+
+
+def _check_profile(name: str):
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DB profile {name!r}; expected one of: {', '.join(PROFILES)}")
+
+
+def set_profile(name: str):
+    """Select the profile used by connections opened from now on."""
+    global DB_PROFILE
+    _check_profile(name)
+    DB_PROFILE = name
+
+
+def apply_profile(conn, name: str):
+    _check_profile(name)
+    for pragma, value in PROFILES[name].items():
+        conn.execute(f"PRAGMA {pragma} = {value};")
+
+
+def get_connection(check_same_thread: bool = True, profile: str = None):
+    conn = sqlite3.connect(DB_FILE, check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     # Enable FK constraints for SQLite
     conn.execute("PRAGMA foreign_keys = ON;")
+    apply_profile(conn, profile or DB_PROFILE)
+    if query_stats.ENABLED:
+        conn.set_trace_callback(query_stats.trace)
     return conn
 
+
+# ---------- Connection pool (one long-lived connection per thread) ----------
+
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pool = []  # every connection handed out, so close_pool() can reach other threads' ones
+_generation = 0  # bumped by close_pool() so threads drop connections that were closed under them
+
+
+def get_thread_connection():
+    """Return this thread's persistent connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    key = (DB_FILE, DB_PROFILE, _generation)
+    if conn is not None and _local.key == key:
+        return conn
+    if conn is not None:
+        # DB_FILE/profile was switched or the pool was closed: drop the stale connection
+        _discard(conn)
+    # Only ever used by the owning thread; the flag lets close_pool() close it from the main thread
+    conn = get_connection(check_same_thread=False)
+    _local.conn = conn
+    _local.key = key
+    with _pool_lock:
+        _pool.append(conn)
+    return conn
+
+
+def _discard(conn):
+    with _pool_lock:
+        if conn in _pool:
+            _pool.remove(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def open_pool(db_file: str = None, profile: str = None):
+    """Application startup hook: select the database and warm the calling thread's connection."""
+    global DB_FILE
+    if db_file:
+        DB_FILE = db_file
+    if profile:
+        set_profile(profile)
+    return get_thread_connection()
+
+
+def close_pool():
+    """Application shutdown hook: close every pooled connection."""
+    global _generation
+    with _pool_lock:
+        conns = list(_pool)
+        _pool.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
 def init_db():
     conn = get_connection()
+    # Every schema at the latest user_version was built (and migrated) here already
+    if get_schema_version(conn) == SCHEMA_VERSION:
+        conn.close()
+        return
     cur = conn.cursor()
 
     # Categories
@@ -114,7 +258,7 @@ def init_db():
         quantity INTEGER NOT NULL,
         price REAL NOT NULL,
         FOREIGN KEY (purchase_id) REFERENCES purchases(id) ON DELETE CASCADE,
-        FOREIGN KEY (medicine_id) REFERENCES medicines(id)
+        FOREIGN KEY (medicine_id) REFERENCES products(id)
     )
     """)
 
@@ -139,7 +283,7 @@ def init_db():
         quantity INTEGER NOT NULL,
         price REAL NOT NULL,
         FOREIGN KEY (bill_id) REFERENCES bills(id) ON DELETE CASCADE,
-        FOREIGN KEY (medicine_id) REFERENCES medicines(id)
+        FOREIGN KEY (medicine_id) REFERENCES products(id)
     )
     """)
 
@@ -189,7 +333,7 @@ def init_db():
         dosage TEXT,
         duration TEXT,
         FOREIGN KEY (prescription_id) REFERENCES prescriptions(id) ON DELETE CASCADE,
-        FOREIGN KEY (medicine_id) REFERENCES medicines(id)
+        FOREIGN KEY (medicine_id) REFERENCES products(id)
     )
     """)
 
@@ -205,4 +349,344 @@ def init_db():
     """)
 
     conn.commit()
+    migrate(conn)
     conn.close()
+
+
+# ---------- Schema migrations ----------
+# Each step upgrades the schema by one version; PRAGMA user_version records how many
+# have been applied. Append new steps to MIGRATIONS, never edit or reorder applied ones.
+
+def _rebuild_table(conn, table: str, transform):
+    """
+    Recreate `table` from its own CREATE statement after passing it through `transform`
+    (SQLite can't ALTER constraints in place). Caller runs this with foreign_keys OFF.
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()
+    if row is None:
+        return
+    old_sql = row[0]
+    new_sql = transform(old_sql)
+    if new_sql == old_sql:
+        return
+    tmp = f"{table}__new"
+    conn.execute(new_sql.replace(table, tmp, 1))
+    conn.execute(f"INSERT INTO {tmp} SELECT * FROM {table}")
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {tmp} RENAME TO {table}")
+
+
+def _m001_product_references(conn):
+    # Line-item tables pointed their medicine_id FK at a `medicines` table that never existed
+    for table in ("purchase_items", "bill_items", "prescription_items"):
+        _rebuild_table(conn, table, lambda sql: sql.replace("REFERENCES medicines(id)", "REFERENCES products(id)"))
+    # The rebuilds ran with foreign_keys OFF; refuse to commit rows the new keys reject
+    for table in ("purchase_items", "bill_items", "prescription_items"):
+        bad = conn.execute(f"PRAGMA foreign_key_check({table})").fetchall()
+        if bad:
+            raise sqlite3.IntegrityError(
+                f"{table}: {len(bad)} row(s) reference missing rows (first: rowid {bad[0][1]} -> {bad[0][2]})")
+
+
+def _m002_hot_path_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bills_customer ON bills(customer_id, bill_date, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bills_date ON bills(bill_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bill_items_bill ON bill_items(bill_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_bill ON payments(bill_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_purchase_items_purchase ON purchase_items(purchase_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_product ON inventory(product_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prescription_items_prescription "
+                 "ON prescription_items(prescription_id)")
+
+
+def _m003_product_search_index(conn):
+    # Trigram FTS5 index over products (external content), kept in sync by triggers.
+    # Trigrams answer substring matches, so it serves the old LIKE '%term%' searches.
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+        id, name, category, manufacturer, batch_number,
+        content='products', content_rowid='rowid', tokenize='trigram'
+    )
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, id, name, category, manufacturer, batch_number)
+        VALUES (new.rowid, new.id, new.name, new.category, new.manufacturer, new.batch_number);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, id, name, category, manufacturer, batch_number)
+        VALUES ('delete', old.rowid, old.id, old.name, old.category, old.manufacturer, old.batch_number);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_fts_au
+    AFTER UPDATE OF id, name, category, manufacturer, batch_number ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, id, name, category, manufacturer, batch_number)
+        VALUES ('delete', old.rowid, old.id, old.name, old.category, old.manufacturer, old.batch_number);
+        INSERT INTO products_fts (rowid, id, name, category, manufacturer, batch_number)
+        VALUES (new.rowid, new.id, new.name, new.category, new.manufacturer, new.batch_number);
+    END
+    """)
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+def _m004_inventory_single_source(conn):
+    # Fold duplicate inventory rows per product into the oldest one, then make product_id unique
+    conn.execute("""
+        UPDATE inventory
+        SET current_stock = (SELECT SUM(d.current_stock) FROM inventory d WHERE d.product_id = inventory.product_id)
+        WHERE id IN (SELECT MIN(id) FROM inventory GROUP BY product_id HAVING COUNT(*) > 1)
+    """)
+    conn.execute("DELETE FROM inventory WHERE id NOT IN (SELECT MIN(id) FROM inventory GROUP BY product_id)")
+    conn.execute("DROP INDEX IF EXISTS idx_inventory_product")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_inventory_product ON inventory(product_id)")
+    # Every product has exactly one stock row, from creation on
+    conn.execute("""
+        INSERT INTO inventory (product_id)
+        SELECT id FROM products WHERE id NOT IN (SELECT product_id FROM inventory)
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_inventory_ai AFTER INSERT ON products BEGIN
+        INSERT OR IGNORE INTO inventory (product_id) VALUES (new.id);
+    END
+    """)
+
+
+def _m005_bill_paid_amount(conn):
+    # Running total of payments, maintained by utils.record_payment; balance_due is derived
+    conn.execute("ALTER TABLE bills ADD COLUMN paid_amount REAL NOT NULL DEFAULT 0")
+    conn.execute("ALTER TABLE bills ADD COLUMN balance_due REAL GENERATED ALWAYS AS (total_amount - paid_amount) VIRTUAL")
+    conn.execute("""
+        UPDATE bills
+        SET paid_amount = (SELECT COALESCE(SUM(amount), 0) FROM payments WHERE payments.bill_id = bills.id)
+    """)
+    conn.execute("UPDATE bills SET payment_status = 'paid' WHERE paid_amount >= total_amount AND paid_amount > 0")
+
+
+def _m006_list_order_indexes(conn):
+    # Keyset pagination of the list windows walks these orders (rowid id breaks ties)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_payments_date ON payments(payment_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_created ON customers(created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_suppliers_created ON suppliers(created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at)")
+
+
+def _m007_product_prefix_indexes(conn):
+    # LIKE 'abc%' is case-insensitive, so it can only range-scan NOCASE indexes
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_id_nocase ON products(id COLLATE NOCASE)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_name_nocase ON products(name COLLATE NOCASE)")
+
+
+def _m008_customer_phone_index(conn):
+    # Bulk customer imports match existing customers by phone number
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_phone ON customers(phone)")
+
+
+def _m009_bill_items_covering_index(conn):
+    # Sales reports aggregate line items per bill; covering the aggregated columns skips the
+    # table lookups. It leads with bill_id, so it also serves everything idx_bill_items_bill did.
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_bill_items_cover ON bill_items(bill_id, medicine_id, quantity, price)")
+    conn.execute("DROP INDEX IF EXISTS idx_bill_items_bill")
+
+
+def _m010_daily_rollups(conn):
+    # Per-day aggregates kept current by utils.create_bill / record_payment, so date-range
+    # reports read one row per day (and product, category or method) instead of every line item
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day TEXT PRIMARY KEY,
+        bills INTEGER NOT NULL DEFAULT 0,
+        sales REAL NOT NULL DEFAULT 0,
+        paid REAL NOT NULL DEFAULT 0    -- payments against that day's bills, whenever received
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_daily_product (
+        day TEXT NOT NULL,
+        product_id TEXT NOT NULL,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, product_id)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sales_daily_category (
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        units INTEGER NOT NULL DEFAULT 0,
+        revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, category)
+    ) WITHOUT ROWID
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS payments_daily_method (
+        day TEXT NOT NULL,
+        method TEXT NOT NULL,
+        payments INTEGER NOT NULL DEFAULT 0,
+        amount REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (day, method)
+    ) WITHOUT ROWID
+    """)
+    rebuild_rollups(conn)
+
+
+def _m011_sequences(conn):
+    # Per-prefix counters for product codes and bill / purchase numbers (see utils.next_code)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS sequences (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+    """)
+    conn.execute("ALTER TABLE bills ADD COLUMN bill_no TEXT")
+    conn.execute("ALTER TABLE purchases ADD COLUMN purchase_no TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_bills_bill_no ON bills(bill_no)")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_purchases_purchase_no ON purchases(purchase_no)")
+    conn.execute("""
+        INSERT INTO sequences (name, value)
+        SELECT 'product', COALESCE(MAX(CAST(substr(id, 2) AS INTEGER)), 0)
+        FROM products WHERE id GLOB 'M[0-9]*' AND substr(id, 2) NOT GLOB '*[^0-9]*'
+    """)
+    conn.execute("INSERT INTO sequences (name, value) VALUES ('bill', 0), ('purchase', 0)")
+    # Codes typed in or imported (e.g. "M0420") move the counter past themselves, so
+    # allocation never has to look at the products table
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_sequence_ai AFTER INSERT ON products
+    WHEN new.id GLOB 'M[0-9]*' AND substr(new.id, 2) NOT GLOB '*[^0-9]*' BEGIN
+        UPDATE sequences SET value = MAX(value, CAST(substr(new.id, 2) AS INTEGER)) WHERE name = 'product';
+    END
+    """)
+    number_documents(conn)
+
+
+def _m012_product_lookup(conn):
+    # Barcodes for the checkout scanner, plus change timestamps the in-memory catalogue
+    # (catalog.ProductIndex) syncs from: any product edit bumps updated_at, and stock
+    # changes already stamp inventory.last_updated
+    conn.execute("ALTER TABLE products ADD COLUMN barcode TEXT")
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_products_barcode ON products(barcode) WHERE barcode IS NOT NULL")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_products_updated ON products(updated_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_inventory_updated ON inventory(last_updated)")
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS products_updated_au AFTER UPDATE ON products
+    WHEN new.updated_at IS old.updated_at BEGIN
+        UPDATE products SET updated_at = datetime('now','localtime') WHERE rowid = new.rowid;
+    END
+    """)
+
+
+def _m013_customer_name_index(conn):
+    # Prescriptions picks the customer by typing a name prefix (LIKE needs a NOCASE index)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_customers_name_nocase ON customers(name COLLATE NOCASE)")
+
+
+MIGRATIONS = [
+    _m001_product_references,
+    _m002_hot_path_indexes,
+    _m003_product_search_index,
+    _m004_inventory_single_source,
+    _m005_bill_paid_amount,
+    _m006_list_order_indexes,
+    _m007_product_prefix_indexes,
+    _m008_customer_phone_index,
+    _m009_bill_items_covering_index,
+    _m010_daily_rollups,
+    _m011_sequences,
+    _m012_product_lookup,
+    _m013_customer_name_index,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn=None) -> int:
+    """Apply every pending migration in order, each in its own transaction. Returns the new version."""
+    own_conn = conn is None
+    if own_conn:
+        conn = get_connection()
+    try:
+        version = get_schema_version(conn)
+        while version < len(MIGRATIONS):
+            # Table rebuilds must not trip FK actions; this pragma is a no-op inside a transaction
+            conn.execute("PRAGMA foreign_keys = OFF;")
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                # Another terminal may have applied steps while this one waited for the lock
+                version = get_schema_version(conn)
+                if version >= len(MIGRATIONS):
+                    conn.rollback()
+                    break
+                MIGRATIONS[version](conn)
+                version += 1
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.execute("PRAGMA foreign_keys = ON;")
+        return version
+    finally:
+        if own_conn:
+            conn.close()
+
+
+# ---------- Daily rollups ----------
+
+ROLLUP_TABLES = ("sales_daily", "sales_daily_product", "sales_daily_category", "payments_daily_method")
+
+
+def rebuild_rollups(conn):
+    """
+    Regenerate every rollup table from bills, bill_items and payments. Run inside a transaction.
+    Categories are taken from the products as they are now, while the live updates record
+    the category a product had when it was sold.
+    """
+    for table in ROLLUP_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("""
+        INSERT INTO sales_daily (day, bills, sales, paid)
+        SELECT date(bill_date), COUNT(*), SUM(total_amount), SUM(paid_amount)
+        FROM bills GROUP BY 1
+    """)
+    conn.execute("""
+        INSERT INTO sales_daily_product (day, product_id, units, revenue)
+        SELECT date(b.bill_date), bi.medicine_id, SUM(bi.quantity), SUM(bi.quantity * bi.price)
+        FROM bills b JOIN bill_items bi ON bi.bill_id = b.id
+        GROUP BY 1, 2
+    """)
+    conn.execute("""
+        INSERT INTO sales_daily_category (day, category, units, revenue)
+        SELECT s.day, COALESCE(p.category, 'Unknown'), SUM(s.units), SUM(s.revenue)
+        FROM sales_daily_product s LEFT JOIN products p ON p.id = s.product_id
+        GROUP BY 1, 2
+    """)
+    conn.execute("""
+        INSERT INTO payments_daily_method (day, method, payments, amount)
+        SELECT date(payment_date), method, COUNT(*), SUM(amount)
+        FROM payments GROUP BY 1, 2
+    """)
+
+
+# ---------- Document numbers ----------
+
+def number_documents(conn):
+    """
+    Number the bills and purchases inserted without one (older rows, bulk loads) in id order,
+    continuing their counters. Run inside a transaction.
+    """
+    for table, column, sequence, prefix in (("bills", "bill_no", "bill", "B"),
+                                            ("purchases", "purchase_no", "purchase", "P")):
+        start = conn.execute("SELECT value FROM sequences WHERE name = ?", (sequence,)).fetchone()[0]
+        numbered = conn.execute(f"""
+            UPDATE {table} SET {column} = printf('{prefix}%06d', ?1 + t.n)
+            FROM (SELECT id, ROW_NUMBER() OVER (ORDER BY id) AS n FROM {table} WHERE {column} IS NULL) AS t
+            WHERE {table}.id = t.id
+        """, (start,)).rowcount
+        conn.execute("UPDATE sequences SET value = value + ? WHERE name = ?", (numbered, sequence))
@@ -0,0 +1,213 @@
+import queue
+import sqlite3
+import sys
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Optional
+
+import query_stats
+from db_config import get_thread_connection
+
+
+class QueryExecutor:
+    """
+    Runs database work on background threads so Tk windows never block on a query.
+
+    Each worker thread uses its own pooled connection (db_config.get_thread_connection).
+    Results are handed back to the Tk main thread by a root.after() poll loop, so
+    callbacks may touch widgets freely. Submitting with a `key` supersedes the previous
+    task with the same key: it is cancelled if still queued, interrupted if running,
+    and its callbacks are never delivered.
+    """
+
+    def __init__(self, max_workers: int = 2, poll_ms: int = 15):
+        self.max_workers = max_workers
+        self.poll_ms = poll_ms
+        self._pool = None
+        self._root = None
+        self._done = queue.SimpleQueue()  # (callback, value, widget) waiting for the main thread
+        self._lock = threading.Lock()
+        self._latest = {}      # key -> newest Future for that key
+        self._running = {}     # Future -> connections it is running on (its pooled one first)
+        self._widgets = {}     # Future -> Tk path of the widget it reports to
+        self._superseded = set()
+        self._current = threading.local()  # .fut: the task this worker thread is running
+
+    # ---------- lifecycle ----------
+
+    def start(self, root=None):
+        """Start the workers; with a Tk root, callbacks are delivered on the main thread."""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db-worker")
+        if root is not None and self._root is None:
+            self._root = root
+            self._root.after(self.poll_ms, self._drain)
+
+    def shutdown(self):
+        self._root = None
+        with self._lock:
+            running = list(self._running)
+        for fut in running:
+            self.cancel(fut)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    # ---------- submit / cancel ----------
+
+    def submit(
+        self,
+        fn: Callable,
+        *args,
+        key: Optional[Hashable] = None,
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[BaseException], None]] = None,
+        widget=None,
+        **kwargs
+    ) -> Future:
+        """
+        Run fn(*args, **kwargs) on a worker. on_done(result) / on_error(exc) are called on
+        the Tk thread; they are skipped if `widget` has been destroyed in the meantime.
+        """
+        self.start()
+        fut = Future()
+        with self._lock:
+            prev = self._latest.get(key) if key is not None else None
+            if key is not None:
+                self._latest[key] = fut
+            if widget is not None:
+                self._widgets[fut] = str(widget)
+        if prev is not None:
+            self.cancel(prev)
+        # Remember which window asked, so query stats attribute the worker's queries to it
+        source = query_stats.caller_source() if query_stats.ENABLED else None
+        self._pool.submit(self._run, fut, key, fn, args, kwargs, on_done, on_error, widget, source)
+        return fut
+
+    def post(self, callback: Callable[[Any], None], value: Any = None, widget=None):
+        """Call callback(value) on the Tk thread; safe from any thread (e.g. progress from a task)."""
+        if self._root is None:
+            callback(value)
+        else:
+            self._done.put((callback, value, widget))
+
+    def cancel(self, fut: Future) -> bool:
+        """Cancel a queued task, or interrupt a running one and drop its result."""
+        if fut.cancel():
+            with self._lock:
+                self._widgets.pop(fut, None)
+            return True
+        with self._lock:
+            if fut.done():
+                return False
+            self._superseded.add(fut)
+            for conn in self._running.get(fut, ()):
+                # Aborts the statement in progress; the worker sees sqlite3.OperationalError("interrupted").
+                # Still under the lock: _run pops _running under it, so the connection can't have
+                # moved on to the next task's statement yet
+                conn.interrupt()
+        return True
+
+    @contextmanager
+    def interruptible(self, conn):
+        """
+        Inside a task, make cancelling the task interrupt `conn` too: for work on a connection
+        other than the worker's pooled one (e.g. a report's read-only-report connection).
+        Outside a task it does nothing.
+        """
+        fut = getattr(self._current, "fut", None)
+        if fut is None:
+            yield conn
+            return
+        with self._lock:
+            if fut in self._superseded:
+                # interrupt() only reaches statements already running; don't start new ones
+                raise sqlite3.OperationalError("interrupted")
+            self._running[fut].append(conn)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                conns = self._running.get(fut)
+                if conns is not None and conn in conns:
+                    conns.remove(conn)
+
+    def cancel_within(self, widget) -> int:
+        """Cancel every pending task reporting to `widget` or one of its descendants."""
+        path = str(widget)
+        with self._lock:
+            futs = [f for f, w in self._widgets.items() if w == path or w.startswith(path + ".")]
+        return sum(self.cancel(f) for f in futs)
+
+    def _run(self, fut, key, fn, args, kwargs, on_done, on_error, widget, source):
+        if not fut.set_running_or_notify_cancel():
+            return
+        conn = get_thread_connection()
+        with self._lock:
+            self._running[fut] = [conn]
+        self._current.fut = fut
+        query_stats.set_source(source)
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            fut.set_exception(exc)
+            callback, value = on_error or _report_error, exc
+        else:
+            fut.set_result(result)
+            callback, value = on_done, result
+        finally:
+            self._current.fut = None
+            query_stats.set_source(None)
+            with self._lock:
+                self._running.pop(fut, None)
+                self._widgets.pop(fut, None)
+                superseded = fut in self._superseded
+                self._superseded.discard(fut)
+                if key is not None and self._latest.get(key) is fut:
+                    del self._latest[key]
+        if superseded or callback is None:
+            return
+        if self._root is None:
+            callback(value)
+        else:
+            self._done.put((callback, value, widget))
+
+    def _drain(self):
+        if self._root is None:
+            return
+        while True:
+            try:
+                callback, value, widget = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if widget is not None and not _widget_alive(widget):
+                continue
+            try:
+                callback(value)
+            except Exception:
+                traceback.print_exc()
+        self._root.after(self.poll_ms, self._drain)
+
+
+def _widget_alive(widget) -> bool:
+    try:
+        return bool(widget.winfo_exists())
+    except Exception:
+        return False
+
+
+def _report_error(exc: BaseException):
+    if isinstance(exc, sqlite3.OperationalError) and str(exc) == "interrupted":
+        return
+    traceback.print_exception(type(exc), exc, exc.__traceback__, file=sys.stderr)
+
+
+# Process-wide executor; PharmacyApp starts it with the Tk root and shuts it down on exit
+executor = QueryExecutor()
+
+
+def run_async(fn: Callable, *args, **kwargs) -> Future:
+    """Shortcut for executor.submit(...)."""
+    return executor.submit(fn, *args, **kwargs)
@@ -0,0 +1,140 @@
+"""Streaming CSV export of the list windows' data, optionally gzip-compressed.
+
+Rows go from a read-only cursor (utils.iter_query) straight into the CSV writer a batch at
+a time, so memory use does not depend on table size. The file is written under a temporary
+name and renamed when complete, so a failed or cancelled export never leaves a partial file.
+
+    python -m exporter medicines medicines.csv.gz
+"""
+import argparse
+import csv
+import gzip
+import os
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+import db_config
+from utils import fetch_one, iter_query
+
+BATCH_ROWS = 2000
+
+# name -> (title, base query, [(column, header), ...]). Headers match what importer.py reads back.
+EXPORTS = {
+    "medicines": ("Medicines", """
+        SELECT id, name, category, manufacturer, batch_number, barcode, product_mrp, product_price, product_expiry
+        FROM products ORDER BY id
+    """, [("id", "ID"), ("name", "Name"), ("category", "Category"), ("manufacturer", "Manufacturer"),
+          ("batch_number", "Batch Number"), ("barcode", "Barcode"), ("product_mrp", "MRP"), ("product_price", "Purchase Price"),
+          ("product_expiry", "Expiry")]),
+    "inventory": ("Inventory", """
+        SELECT p.id, p.name, p.category, i.current_stock, i.minimum_stock, i.reorder_level,
+               CASE WHEN i.current_stock < i.minimum_stock THEN 'Low Stock' ELSE 'In Stock' END AS status,
+               i.last_updated
+        FROM inventory i JOIN products p ON p.id = i.product_id ORDER BY p.id
+    """, [("id", "ID"), ("name", "Name"), ("category", "Category"), ("current_stock", "Stock"),
+          ("minimum_stock", "Min Stock"), ("reorder_level", "Reorder Level"), ("status", "Status"),
+          ("last_updated", "Last Updated")]),
+    "bills": ("Bills", """
+        SELECT b.id, b.bill_date, b.customer_id, c.name AS customer, b.total_amount, b.paid_amount,
+               b.balance_due, b.payment_status
+        FROM bills b LEFT JOIN customers c ON c.id = b.customer_id ORDER BY b.id
+    """, [("id", "Bill ID"), ("bill_date", "Date"), ("customer_id", "Customer ID"), ("customer", "Customer"),
+          ("total_amount", "Total"), ("paid_amount", "Paid"), ("balance_due", "Due"),
+          ("payment_status", "Status")]),
+    "payments": ("Payments", """
+        SELECT id, bill_id, amount, method, reference, payment_date FROM payments ORDER BY id
+    """, [("id", "ID"), ("bill_id", "Bill"), ("amount", "Amount"), ("method", "Method"),
+          ("reference", "Reference"), ("payment_date", "Date")]),
+    "customers": ("Customers", """
+        SELECT id, name, gender, dob, address, email, phone, created_at FROM customers ORDER BY id
+    """, [("id", "ID"), ("name", "Name"), ("gender", "Gender"), ("dob", "DOB"), ("address", "Address"),
+          ("email", "Email"), ("phone", "Phone"), ("created_at", "Created")]),
+    "suppliers": ("Suppliers", """
+        SELECT id, name, contact_person, phone, email, address, created_at FROM suppliers ORDER BY id
+    """, [("id", "ID"), ("name", "Name"), ("contact_person", "Contact Person"), ("phone", "Phone"),
+          ("email", "Email"), ("address", "Address"), ("created_at", "Created")]),
+    # Never the password column
+    "users": ("Users", "SELECT id, username, role, created_at FROM users ORDER BY id",
+              [("id", "ID"), ("username", "Username"), ("role", "Role"), ("created_at", "Created")]),
+}
+
+
+def _open(path: str, compress: bool):
+    if compress:
+        return gzip.open(path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(path, "w", newline="", encoding="utf-8")
+
+
+def export_csv(name: str, path: str, columns: Optional[Sequence[str]] = None,
+               progress: Optional[Callable[[dict], None]] = None,
+               stop: Optional[threading.Event] = None) -> dict:
+    """
+    Write EXPORTS[name] to `path` (gzip-compressed if it ends in .gz), limited to `columns`
+    in the given order if set. `progress(counts)` is called after every batch with the rows
+    written and the fraction done; setting `stop` cancels. Returns the counts and the time taken.
+    """
+    title, query, available = EXPORTS[name]
+    headers = dict(available)
+    columns = list(columns or headers)
+    unknown = [c for c in columns if c not in headers]
+    if unknown:
+        raise ValueError(f"Unknown {title.lower()} columns: {', '.join(unknown)}")
+    started = time.perf_counter()
+    total = fetch_one(f"SELECT COUNT(*) AS n FROM ({query})")["n"] or 0
+    select = f"SELECT {', '.join(columns)} FROM ({query})"
+    counts = {"rows": 0, "total": total, "cancelled": False}
+    tmp = path + ".part"
+    rows = iter_query(select, batch_size=BATCH_ROWS, raw=True)
+    try:
+        with _open(tmp, path.endswith(".gz")) as f:
+            writer = csv.writer(f)
+            writer.writerow([headers[c] for c in columns])
+            batch = []
+            for row in rows:
+                batch.append(row)
+                if len(batch) < BATCH_ROWS:
+                    continue
+                writer.writerows(batch)
+                counts["rows"] += len(batch)
+                batch = []
+                if stop is not None and stop.is_set():
+                    counts["cancelled"] = True
+                    break
+                if progress:
+                    progress(dict(counts, fraction=counts["rows"] / total if total else 1.0))
+            else:
+                writer.writerows(batch)
+                counts["rows"] += len(batch)
+        if counts["cancelled"]:
+            os.remove(tmp)
+        else:
+            os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    finally:
+        rows.close()
+    counts["path"] = None if counts["cancelled"] else path
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("name", choices=sorted(EXPORTS))
+    parser.add_argument("path", help="output file; a .gz suffix compresses it")
+    parser.add_argument("--columns", nargs="+", help="columns to include, in order (default: all)")
+    parser.add_argument("--db", help="database file (default: db_config.DB_FILE)")
+    args = parser.parse_args()
+
+    if args.db:
+        db_config.DB_FILE = args.db
+    result = export_csv(args.name, args.path, args.columns,
+                        progress=lambda c: print(f"\r  {c['rows']:,} rows ({c['fraction']:.0%})", end="", flush=True))
+    print(f"\nExported {result['rows']:,} rows to {result['path']} in {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+"""Streaming bulk import of products, customers and opening stock from CSV or JSON.
+
+The file is read a chunk at a time, so memory stays flat however large it is. Every row is
+validated (products by the same rules as the product form), valid rows are upserted with
+executemany in one transaction per chunk, and rejected rows are written to a CSV next to the
+input with the line number and the reason.
+
+Imports run on a live-import connection, safe while other counters keep billing. Only an
+explicit offline load (--offline, with nothing else using the database) gets the faster,
+unsynced bulk-import profile.
+
+    python -m importer products price_list.csv
+    python -m importer --offline products price_list.csv
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import db_config
+from utils import touch_tables, validate_product
+
+CHUNK_ROWS = 5000
+_READ_SIZE = 1 << 16
+MAX_JSON_ELEMENT = 1 << 20  # characters; a longer "element" is a malformed file, not a row
+
+
+# ---------- Input ----------
+
+class _Source:
+    """Rows of a CSV, JSON array or JSON Lines file as (line number, dict), plus progress through it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path) or 1
+        self._raw = open(path, "rb")
+        self._text = io.TextIOWrapper(self._raw, encoding="utf-8-sig", newline="")
+
+    def fraction(self) -> float:
+        # The binary stream runs a read-ahead buffer in front of the parser; close enough for a progress bar
+        return min(1.0, self._raw.tell() / self.size)
+
+    def rows(self) -> Iterator[Tuple[int, Any]]:
+        ext = os.path.splitext(self.path)[1].lower()
+        if ext in (".jsonl", ".ndjson"):
+            return self._json_lines()
+        if ext == ".json":
+            head = self._text.read(1)
+            while head.isspace():
+                head = self._text.read(1)
+            return self._json_array() if head == "[" else self._json_lines(head)
+        return self._csv()
+
+    def _csv(self):
+        reader = csv.DictReader(self._text)
+        for row in reader:
+            yield reader.line_num, row
+
+    def _json_lines(self, head: str = ""):
+        for n, line in enumerate(self._text, 1):
+            line = (head + line).strip() if n == 1 else line.strip()
+            if line:
+                yield n, _json_row(line)
+
+    def _json_array(self):
+        """Yield the elements of a top-level JSON array (its "[" already consumed) without loading it whole."""
+        decoder = json.JSONDecoder()
+        buf, pos, n = "", 0, 0
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError
+                obj, end = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Element cut off at the end of the buffer (or buffer empty): read more and retry
+                if len(buf) - pos > MAX_JSON_ELEMENT:
+                    raise ValueError(f"Malformed JSON after element {n} (no complete element in "
+                                     f"{MAX_JSON_ELEMENT:,} characters).")
+                more = self._text.read(_READ_SIZE)
+                if not more:
+                    if buf[pos:].strip():
+                        raise ValueError(f"Malformed JSON after element {n}.")
+                    raise ValueError("JSON array is not terminated.")
+                buf, pos = buf[pos:] + more, 0
+                continue
+            n += 1
+            yield n, obj
+            pos = end
+
+    def close(self):
+        self._text.close()
+
+
+def _json_row(line: str):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _BadRow(f"Invalid JSON: {e}")
+
+
+class _BadRow(str):
+    """A row that could not even be parsed; rejected with this message."""
+
+
+def _normalize(raw: dict, aliases: Dict[str, str]) -> dict:
+    row = {}
+    for key, value in raw.items():
+        if key is None:
+            continue  # extra CSV fields beyond the header
+        name = str(key).strip().lower().replace(" ", "_")
+        row[aliases.get(name, name)] = value
+    return row
+
+
+def _text(row: dict, key: str) -> str:
+    value = row.get(key)
+    return "" if value is None else str(value).strip()
+
+
+def _optional(row: dict, key: str) -> Optional[str]:
+    return _text(row, key) or None
+
+
+def _optional_number(row: dict, key: str, label: str, kind=float) -> Optional[Any]:
+    text = _text(row, key)
+    if not text:
+        return None
+    try:
+        value = kind(float(text)) if kind is int else kind(text)
+    except ValueError:
+        raise ValueError(f"{label} must be a number.")
+    if value < 0:
+        raise ValueError(f"{label} must be ≥ 0.")
+    return value
+
+
+# ---------- Import kinds ----------
+# prepare(row) turns a normalized row into statement parameters or raises ValueError;
+# write(conn, params) stores a batch; check(conn, params) returns {index: error} for rows
+# that need a lookup to validate.
+
+def _prepare_product(row: dict) -> tuple:
+    product_id = _text(row, "id")
+    if not product_id:
+        raise ValueError("ID is required.")
+    name, category = _text(row, "name"), _text(row, "category")
+    mrp, expiry = _text(row, "product_mrp"), _text(row, "product_expiry")
+    error = validate_product(name, category, mrp, expiry)
+    if error:
+        raise ValueError(error)
+    return (product_id, name, category, _optional(row, "manufacturer"), _optional(row, "batch_number"),
+            float(mrp), _optional_number(row, "product_price", "Purchase price"),
+            _optional(row, "product_unit"), _optional(row, "packing_size"), expiry, _optional(row, "barcode"))
+
+
+def _write_products(conn, params: List[tuple]):
+    # Upsert, not INSERT OR REPLACE: a replace deletes the row, which would cascade to its
+    # inventory and bypass the search-index update trigger. Blank optional columns keep their value.
+    conn.executemany("""
+        INSERT INTO products (id, name, category, manufacturer, batch_number, product_mrp, product_price,
+                              product_unit, packing_size, product_expiry, barcode)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?6, COALESCE(?7, 0), ?8, ?9, ?10, ?11)
+        ON CONFLICT(id) DO UPDATE SET
+            name = excluded.name,
+            category = excluded.category,
+            manufacturer = COALESCE(?4, manufacturer),
+            batch_number = COALESCE(?5, batch_number),
+            product_mrp = excluded.product_mrp,
+            product_price = COALESCE(?7, product_price),
+            product_unit = COALESCE(?8, product_unit),
+            packing_size = COALESCE(?9, packing_size),
+            product_expiry = excluded.product_expiry,
+            barcode = COALESCE(?11, barcode),
+            updated_at = datetime('now','localtime')
+    """, params)
+
+
+def _prepare_customer(row: dict) -> tuple:
+    name = _text(row, "name")
+    if not name:
+        raise ValueError("Name is required.")
+    dob = _optional(row, "dob")
+    if dob:
+        try:
+            datetime.strptime(dob, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("DOB must be in YYYY-MM-DD format.")
+    return (name, _optional(row, "gender"), dob, _optional(row, "address"), _optional(row, "email"),
+            _optional(row, "phone"))
+
+
+def _write_customers(conn, params: List[tuple]):
+    # Customers have no natural key but their phone number: a known phone updates that
+    # customer, anything else is added. Inserting first makes the last duplicate in a file win.
+    conn.executemany("""
+        INSERT INTO customers (name, gender, dob, address, email, phone)
+        SELECT ?1, ?2, ?3, ?4, ?5, ?6
+        WHERE ?6 IS NULL OR NOT EXISTS (SELECT 1 FROM customers WHERE phone = ?6)
+    """, params)
+    conn.executemany("""
+        UPDATE customers
+        SET name = ?1, gender = COALESCE(?2, gender), dob = COALESCE(?3, dob),
+            address = COALESCE(?4, address), email = COALESCE(?5, email),
+            updated_at = datetime('now','localtime')
+        WHERE ?6 IS NOT NULL AND phone = ?6
+    """, [p for p in params if p[5] is not None])
+
+
+def _prepare_stock(row: dict) -> tuple:
+    product_id = _text(row, "product_id")
+    if not product_id:
+        raise ValueError("Product ID is required.")
+    stock = _optional_number(row, "current_stock", "Stock", int)
+    if stock is None:
+        raise ValueError("Stock is required.")
+    return product_id, stock, _optional_number(row, "minimum_stock", "Minimum stock", int)
+
+
+def _check_stock(conn, params: List[tuple]) -> Dict[int, str]:
+    ids = json.dumps(sorted({p[0] for p in params}))
+    known = {r[0] for r in conn.execute(
+        "SELECT p.id FROM json_each(?) j JOIN products p ON p.id = j.value", (ids,))}
+    return {i: f"Unknown product {p[0]}." for i, p in enumerate(params) if p[0] not in known}
+
+
+def _write_stock(conn, params: List[tuple]):
+    conn.executemany("""
+        INSERT INTO inventory (product_id, current_stock, minimum_stock)
+        VALUES (?1, ?2, COALESCE(?3, 10))
+        ON CONFLICT(product_id) DO UPDATE SET
+            current_stock = excluded.current_stock,
+            minimum_stock = COALESCE(?3, minimum_stock),
+            last_updated = datetime('now','localtime')
+    """, params)
+
+
+KINDS = {
+    "products": {
+        "aliases": {"mrp": "product_mrp", "expiry": "product_expiry", "purchase_price": "product_price",
+                    "unit": "product_unit", "batch": "batch_number", "ean": "barcode"},
+        "prepare": _prepare_product, "check": None, "write": _write_products,
+        "tables": ("products", "inventory"),  # new products get an inventory row by trigger
+    },
+    "customers": {
+        "aliases": {"mobile": "phone"},
+        "prepare": _prepare_customer, "check": None, "write": _write_customers,
+        "tables": ("customers",),
+    },
+    "stock": {
+        "aliases": {"id": "product_id", "medicine_id": "product_id", "stock": "current_stock",
+                    "quantity": "current_stock", "min_stock": "minimum_stock"},
+        "prepare": _prepare_stock, "check": _check_stock, "write": _write_stock,
+        "tables": ("inventory",),
+    },
+}
+
+
+# ---------- Pipeline ----------
+
+class _Rejects:
+    """CSV of rejected rows, created on the first reject."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, line: int, raw: Any, error: str):
+        if self._writer is None:
+            fields = ["line", "error"] + (list(raw) if isinstance(raw, dict) else [])
+            self._file = open(self.path, "w", newline="", encoding="utf-8")
+            self._writer = csv.DictWriter(self._file, fieldnames=fields, extrasaction="ignore", restval="")
+            self._writer.writeheader()
+        row = dict(raw) if isinstance(raw, dict) else {}
+        row.pop(None, None)
+        row.update(line=line, error=error)
+        self._writer.writerow(row)
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _chunks(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _store(conn, write: Callable, params: List[tuple]) -> List[Tuple[int, str]]:
+    """Write a chunk in one transaction; if it hits a constraint, redo it row by row. Returns (index, error) of failed rows."""
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        write(conn, params)
+        conn.commit()
+        return []
+    except sqlite3.IntegrityError:
+        conn.rollback()
+    failed = []
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for i, p in enumerate(params):
+            conn.execute("SAVEPOINT import_row")
+            try:
+                write(conn, [p])
+                conn.execute("RELEASE import_row")
+            except sqlite3.IntegrityError as e:
+                conn.execute("ROLLBACK TO import_row")
+                conn.execute("RELEASE import_row")
+                failed.append((i, str(e)))
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return failed
+
+
+def import_file(kind: str, path: str, reject_path: Optional[str] = None,
+                progress: Optional[Callable[[dict], None]] = None, chunk_rows: int = CHUNK_ROWS,
+                profile: str = "live-import") -> dict:
+    """
+    Import `path` (.csv, .json or .jsonl) as `kind` ("products", "customers" or "stock").
+    Pass profile="bulk-import" only for an offline load with nothing else using the database.
+    `progress(counts)` is called after every chunk with read/imported/rejected counts and the
+    fraction of the file done. Returns the final counts, the reject file (or None) and the time taken.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Unknown import kind {kind!r}; expected one of {', '.join(KINDS)}")
+    spec = KINDS[kind]
+    started = time.perf_counter()
+    source = _Source(path)
+    rejects = _Rejects(reject_path or os.path.splitext(path)[0] + ".rejects.csv")
+    counts = {"read": 0, "imported": 0, "rejected": 0}
+    conn = db_config.get_connection(profile=profile)
+    try:
+        for chunk in _chunks(source.rows(), chunk_rows):
+            good, bad = [], []  # (line, raw row, params) / (line, raw row, error)
+            for line, raw in chunk:
+                if isinstance(raw, _BadRow):
+                    bad.append((line, None, str(raw)))
+                elif not isinstance(raw, dict):
+                    bad.append((line, None, "Row is not an object."))
+                else:
+                    try:
+                        good.append((line, raw, spec["prepare"](_normalize(raw, spec["aliases"]))))
+                    except ValueError as e:
+                        bad.append((line, raw, str(e)))
+            if spec["check"] and good:
+                errors = spec["check"](conn, [p for _, _, p in good])
+                bad.extend((line, raw, errors[i]) for i, (line, raw, _) in enumerate(good) if i in errors)
+                good = [g for i, g in enumerate(good) if i not in errors]
+            if good:
+                for i, error in _store(conn, spec["write"], [p for _, _, p in good]):
+                    bad.append((good[i][0], good[i][1], error))
+                touch_tables(*spec["tables"])
+            for line, raw, error in sorted(bad, key=lambda b: b[0]):
+                rejects.add(line, raw, error)
+            counts["read"] += len(chunk)
+            counts["rejected"] = rejects.count
+            counts["imported"] = counts["read"] - counts["rejected"]
+            if progress:
+                progress(dict(counts, fraction=source.fraction()))
+    finally:
+        conn.close()
+        source.close()
+        rejects.close()
+    counts["reject_path"] = rejects.path if rejects.count else None
+    counts["seconds"] = round(time.perf_counter() - started, 3)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=sorted(KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--rejects", help="reject file (default: <input>.rejects.csv)")
+    parser.add_argument("--db", help="database file (default: db_config.DB_FILE)")
+    parser.add_argument("--offline", action="store_true",
+                        help="faster unsynced load; only while no terminal is using the database")
+    args = parser.parse_args()
+
+    if args.db:
+        db_config.DB_FILE = args.db
+    db_config.init_db()
+    result = import_file(args.kind, args.path, args.rejects,
+                         profile="bulk-import" if args.offline else "live-import",
+                         progress=lambda c: print(f"\r  {c['read']:,} rows ({c['fraction']:.0%})", end="", flush=True))
+    print(f"\nImported {result['imported']:,} of {result['read']:,} rows in {result['seconds']}s"
+          + (f"; {result['rejected']:,} rejected, see {result['reject_path']}" if result["rejected"] else ""))
+
+
+if __name__ == "__main__":
+    main()
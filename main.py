@@ -1,27 +1,46 @@
+import faulthandler
+import importlib
 import tkinter as tk
 from tkinter import messagebox
-from db_config import init_db
-# Importing modules
-from modules.login import LoginWindow
-from modules.main import MainWindow
-from modules.medicines import MedicinesWindow
-from modules.sales import SalesWindow
-from modules.inventory import InventoryWindow
-from modules.reports import ReportsWindow
-from modules.settings import SettingsWindow
-from modules.customers import CustomersWindow
-from modules.suppliers import SuppliersWindow
-from modules.purchases import PurchasesWindow
-from modules.prescriptions import PrescriptionsWindow
-from modules.payments import PaymentsWindow
-from modules.users import UsersWindow
+from db_config import init_db, open_pool, close_pool
+from db_worker import executor
+from window_manager import WindowManager
+
+# ---------------- Window registry ---------------- #
+# name -> (module, class). A window's module (and whatever it pulls in) is imported the
+# first time the window is opened, so startup only pays for the login screen.
+WINDOWS = {
+    "login": ("modules.login", "LoginWindow"),
+    "main": ("modules.main", "MainWindow"),
+    "medicines": ("modules.medicines", "MedicinesWindow"),
+    "sales": ("modules.sales", "SalesWindow"),
+    "inventory": ("modules.inventory", "InventoryWindow"),
+    "reports": ("modules.reports", "ReportsWindow"),
+    "settings": ("modules.settings", "SettingsWindow"),
+    "customers": ("modules.customers", "CustomersWindow"),
+    "suppliers": ("modules.suppliers", "SuppliersWindow"),
+    "purchases": ("modules.purchases", "PurchasesWindow"),
+    "prescriptions": ("modules.prescriptions", "PrescriptionsWindow"),
+    "payments": ("modules.payments", "PaymentsWindow"),
+    "users": ("modules.users", "UsersWindow"),
+}
+
+
+def window_class(name: str):
+    module, cls = WINDOWS[name]
+    return getattr(importlib.import_module(module), cls)
 
 
 class PharmacyApp:
     def __init__(self):
         init_db()
+        open_pool()
         self.root = tk.Tk()
         self.root.withdraw()  # hide until login
+        executor.start(self.root)
+        # The login window is only ever needed once
+        self.windows = WindowManager(self.root, window_class, on_create=self.set_close_protocol,
+                                     single_use=("login",))
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         self.show_login_window()
 
@@ -31,83 +50,68 @@ class PharmacyApp:
 
     # ---------------- Windows ---------------- #
 
+    def open_window(self, name: str):
+        """Show the window called `name`, reusing the open or recently closed instance if there is one."""
+        return self.windows.show(name, self)
+
     def show_login_window(self):
-        login_win = tk.Toplevel(self.root)
-        self.set_close_protocol(login_win)
-        LoginWindow(login_win, self)
+        self.open_window("login")
 
     def show_main_window(self):
-        main_win = tk.Toplevel(self.root)
-        self.set_close_protocol(main_win)
-        MainWindow(main_win, self)
+        self.open_window("main")
 
     def show_medicines_window(self):
-        medicines_win = tk.Toplevel(self.root)
-        self.set_close_protocol(medicines_win)
-        MedicinesWindow(medicines_win, self)
+        self.open_window("medicines")
 
     def show_sales_window(self):
-        sales_win = tk.Toplevel(self.root)
-        self.set_close_protocol(sales_win)
-        SalesWindow(sales_win, self)
+        self.open_window("sales")
 
     def show_inventory_window(self):
-        inventory_win = tk.Toplevel(self.root)
-        self.set_close_protocol(inventory_win)
-        InventoryWindow(inventory_win, self)
+        self.open_window("inventory")
 
     def show_reports_window(self):
-        reports_win = tk.Toplevel(self.root)
-        self.set_close_protocol(reports_win)
-        ReportsWindow(reports_win, self)
+        self.open_window("reports")
 
     def show_settings_window(self):
-        settings_win = tk.Toplevel(self.root)
-        self.set_close_protocol(settings_win)
-        SettingsWindow(settings_win, self)
+        self.open_window("settings")
 
     def show_customers_window(self):
-        customers_win = tk.Toplevel(self.root)
-        self.set_close_protocol(customers_win)
-        CustomersWindow(customers_win, self)
+        self.open_window("customers")
 
     def show_suppliers_window(self):
-        suppliers_win = tk.Toplevel(self.root)
-        self.set_close_protocol(suppliers_win)
-        SuppliersWindow(suppliers_win, self)
+        self.open_window("suppliers")
 
     def show_purchases_window(self):
-        purchases_win = tk.Toplevel(self.root)
-        self.set_close_protocol(purchases_win)
-        PurchasesWindow(purchases_win, self)
+        self.open_window("purchases")
 
     def show_prescriptions_window(self):
-        prescriptions_win = tk.Toplevel(self.root)
-        self.set_close_protocol(prescriptions_win)
-        PrescriptionsWindow(prescriptions_win, self)
+        self.open_window("prescriptions")
 
     def show_payments_window(self):
-        payments_win = tk.Toplevel(self.root)
-        self.set_close_protocol(payments_win)
-        PaymentsWindow(payments_win, self)
+        self.open_window("payments")
 
     def show_users_window(self):
-        users_win = tk.Toplevel(self.root)
-        self.set_close_protocol(users_win)
-        UsersWindow(users_win, self)
+        self.open_window("users")
 
     # ---------------- Close ---------------- #
 
     def on_close(self):
         """Destroy the entire application cleanly with confirmation"""
         if messagebox.askokcancel("Exit", "Are you sure you want to exit the application?"):
+            self.windows.close_all()
             self.root.quit()
             self.root.destroy()
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            # Every exit path (main window, login window, Ctrl+C) ends up here
+            executor.shutdown()
+            close_pool()
 
 
 if __name__ == "__main__":
+    faulthandler.enable()
     app = PharmacyApp()
     app.run()
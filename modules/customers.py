@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils import fetch_all, execute_query, get_last_bill, get_customer_bills, format_currency
+from utils import fetch_all, execute_query, get_last_bill, get_customer_bills, format_currency, KeysetPager
+from db_worker import run_async
+from widgets import VirtualTreeview, run_import, run_export
 
 class CustomersWindow:
     def __init__(self, root, app):
@@ -19,6 +21,8 @@ class CustomersWindow:
         ttk.Button(toolbar, text="Edit", command=self.edit_customer).pack(side=tk.LEFT, padx=4)
         ttk.Button(toolbar, text="Delete", command=self.delete_customer).pack(side=tk.LEFT, padx=4)
         ttk.Button(toolbar, text="Refresh", command=self.load_customers).pack(side=tk.LEFT, padx=4)
+        ttk.Button(toolbar, text="Import", command=lambda: run_import(self.root, "customers", self.load_customers)).pack(side=tk.LEFT, padx=4)
+        ttk.Button(toolbar, text="Export", command=lambda: run_export(self.root, "customers")).pack(side=tk.LEFT, padx=4)
 
         search_frm = ttk.Frame(left)
         search_frm.pack(fill=tk.X, pady=4)
@@ -28,11 +32,12 @@ class CustomersWindow:
         ent.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=4)
         ent.bind("<Return>", lambda e: self.load_customers())
 
-        self.tree = ttk.Treeview(left, columns=("id","name","phone","email"), show="headings", height=18)
+        self.vlist = VirtualTreeview(left, ("id","name","phone","email"), self._customer_values, height=18)
+        self.tree = self.vlist.tree
         for c in ("id","name","phone","email"):
             self.tree.heading(c, text=c.capitalize())
             self.tree.column(c, width=120 if c=="id" else 160, stretch=True)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.vlist.pack(fill=tk.BOTH, expand=True)
         self.tree.bind("<<TreeviewSelect>>", self.on_select_customer)
 
         # Right: last bill
@@ -58,23 +63,22 @@ class CustomersWindow:
 
     def load_customers(self):
         q = self.search_var.get().strip()
+        query = "SELECT id, name, phone, email, created_at FROM customers"
+        params = ()
         if q:
-            rows = fetch_all("""
-                SELECT id, name, phone, email
-                FROM customers
-                WHERE name LIKE ? OR phone LIKE ? OR email LIKE ?
-                ORDER BY created_at DESC
-            """, (f"%{q}%", f"%{q}%", f"%{q}%"))
-        else:
-            rows = fetch_all("SELECT id, name, phone, email FROM customers ORDER BY created_at DESC")
-
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        for r in rows:
-            self.tree.insert("", tk.END, values=(r["id"], r["name"], r.get("phone",""), r.get("email","")))
-
+            query += " WHERE name LIKE ? OR phone LIKE ? OR email LIKE ?"
+            params = (f"%{q}%", f"%{q}%", f"%{q}%")
+        # Newest first, a page at a time; retyping the search supersedes the previous page load
+        self.vlist.set_pager(KeysetPager(query, ("created_at", "id"), params, descending=True))
         self.clear_bill_preview()
 
+    @staticmethod
+    def _customer_values(r):
+        return (r["id"], r["name"], r.get("phone",""), r.get("email",""))
+
+    def refresh(self):
+        self.load_customers()
+
     def get_selected_customer_id(self):
         sel = self.tree.selection()
         if not sel:
@@ -87,8 +91,12 @@ class CustomersWindow:
         if cid is None:
             self.clear_bill_preview()
             return
-        bill = get_last_bill(cid)
-        self.render_last_bill(bill)
+        # Arrow-key scrolling fires this per row; only the last selection's query survives
+        run_async(get_last_bill, cid, key=(self, "last_bill"), widget=self.items,
+                  on_done=self.render_last_bill, on_error=self._show_db_error)
+
+    def _show_db_error(self, exc):
+        messagebox.showerror("DB Error", str(exc), parent=self.root)
 
     def clear_bill_preview(self):
         self.bill_info.delete("1.0", tk.END)
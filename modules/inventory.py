@@ -1,7 +1,9 @@
 import tkinter as tk
-from tkinter import ttk, messagebox, simpledialog, filedialog
+from tkinter import ttk, messagebox, simpledialog
 from tkinter import font as tkfont
-import csv
+from utils import get_inventory, update_medicine_stock, transaction, touch_tables
+from db_worker import run_async
+from widgets import run_import, run_export
 
 class InventoryWindow:
     def __init__(self, master, app):
@@ -11,18 +13,6 @@ class InventoryWindow:
         self.master.geometry("950x600")
         self.master.configure(bg='#f5f5f5')
 
-        self.inventory = [
-            ('M001', 'Paracetamol', 'Pain Relief', 120, 20, '✅ In Stock'),
-            ('M002', 'Amoxicillin', 'Antibiotic', 45, 30, '✅ In Stock'),
-            ('M003', 'Vitamin C', 'Supplements', 12, 15, '⚠️ Low Stock'),
-            ('M004', 'Ibuprofen', 'Pain Relief', 80, 20, '✅ In Stock'),
-            ('M005', 'Omeprazole', 'Digestive', 60, 25, '✅ In Stock'),
-            ('M006', 'Aspirin', 'Pain Relief', 200, 30, '✅ In Stock'),
-            ('M007', 'Loratadine', 'Allergy', 30, 20, '✅ In Stock'),
-            ('M008', 'Metformin', 'Diabetes', 25, 30, '⚠️ Low Stock'),
-            ('M009', 'Atorvastatin', 'Cholesterol', 18, 15, '⚠️ Low Stock'),
-        ]
-
         self.setup_ui()
 
     def setup_ui(self):
@@ -74,21 +64,35 @@ class InventoryWindow:
 
         ttk.Button(action_frame, text="➕ Add New Item", command=self.add_item).pack(side='left', padx=5)
         ttk.Button(action_frame, text="✏️ Update Stock", command=self.update_stock).pack(side='left', padx=5)
+        ttk.Button(action_frame, text="📥 Import Opening Stock",
+                   command=lambda: run_import(self.master, "stock", self.refresh_tree)).pack(side='left', padx=5)
         ttk.Button(action_frame, text="📤 Export Inventory", command=self.export_inventory).pack(side='right', padx=5)
 
+    @staticmethod
+    def stock_status(stock, min_stock):
+        return "⚠️ Low Stock" if stock < min_stock else "✅ In Stock"
+
     def refresh_tree(self):
-        """Refresh TreeView with current inventory"""
+        """Reload the TreeView from the inventory table"""
+        run_async(get_inventory, key=(self, "inventory"), widget=self.tree, on_done=self._fill_tree,
+                  on_error=lambda e: messagebox.showerror("DB Error", str(e), parent=self.master))
+
+    def _fill_tree(self, rows):
         for row in self.tree.get_children():
             self.tree.delete(row)
 
-        for item in self.inventory:
-            tag = "low" if "⚠️" in item[5] else "ok"
-            self.tree.insert('', 'end', values=item, tags=(tag,))
+        for r in rows:
+            status = self.stock_status(r["current_stock"], r["minimum_stock"])
+            tag = "low" if r["current_stock"] < r["minimum_stock"] else "ok"
+            self.tree.insert('', 'end', values=(r["id"], r["name"], r["category"], r["current_stock"],
+                                                r["minimum_stock"], status), tags=(tag,))
 
         # Color coding
         self.tree.tag_configure("low", background="#ffe6e6", foreground="#e74c3c")
         self.tree.tag_configure("ok", background="#eaffea", foreground="#2ecc71")
 
+    refresh = refresh_tree
+
     def add_item(self):
         """Add new inventory item"""
         id_ = simpledialog.askstring("Add Item", "Enter Item ID:")
@@ -102,9 +106,21 @@ class InventoryWindow:
         except (ValueError, TypeError):
             messagebox.showerror("Error", "Invalid stock or minimum stock value")
             return
+        if stock < 0 or min_stock < 0:
+            messagebox.showerror("Error", "Stock values cannot be negative")
+            return
 
-        status = "⚠️ Low Stock" if stock < min_stock else "✅ In Stock"
-        self.inventory.append((id_, name, category, stock, min_stock, status))
+        try:
+            with transaction() as conn:
+                # The products insert trigger creates the inventory row
+                conn.execute("INSERT INTO products (id, name, category) VALUES (?, ?, ?)",
+                             (id_.strip(), (name or "").strip() or id_.strip(), (category or "").strip() or "General"))
+                conn.execute("UPDATE inventory SET current_stock = ?, minimum_stock = ? WHERE product_id = ?",
+                             (stock, min_stock, id_.strip()))
+                touch_tables("products")
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
         self.refresh_tree()
 
     def update_stock(self):
@@ -118,24 +134,14 @@ class InventoryWindow:
         new_stock = simpledialog.askinteger("Update Stock", f"Enter new stock for {item_values[1]}:", initialvalue=item_values[3])
 
         if new_stock is not None:
-            min_stock = int(item_values[4])
-            status = "⚠️ Low Stock" if new_stock < min_stock else "✅ In Stock"
-
-            # Update inventory list
-            for i, item in enumerate(self.inventory):
-                if item[0] == item_values[0]:
-                    self.inventory[i] = (item[0], item[1], item[2], new_stock, min_stock, status)
-                    break
+            try:
+                update_medicine_stock(item_values[0], new_stock)
+            except Exception as e:
+                messagebox.showerror("Error", str(e))
+                return
             self.refresh_tree()
 
     def export_inventory(self):
         """Export inventory data to CSV"""
-        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files","*.csv")])
-        if file_path:
-            with open(file_path, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["ID", "Name", "Category", "Stock", "Min Stock", "Status"])
-                for row in self.inventory:
-                    writer.writerow(row)
-            messagebox.showinfo("Export Successful", f"Inventory exported to {file_path}")
+        run_export(self.master, "inventory")
 
@@ -1,11 +1,17 @@
 import customtkinter as ctk
 import time
 
+from db_worker import run_async
+from utils import format_currency, get_dashboard_stats
+
+STATS_REFRESH_MS = 5000
+
 
 class MainWindow:
     def __init__(self, master, app):
         self.master = master
         self.app = app
+        self._stats_after = None
 
         # Theme
         ctk.set_appearance_mode("light")
@@ -88,22 +94,26 @@ class MainWindow:
         stats_frame.pack(fill="x", pady=10)
 
         stats = [
-            ("Total Medicines", "128", self.primary_color),
-            ("Low Stock Items", "5", self.accent_color),
-            ("Today's Sales", "$1,240", self.success_color),
-            ("Total Sales", "$12,580", self.secondary_color),
+            ("medicines", "Total Medicines", self.primary_color),
+            ("low_stock", "Low Stock Items", self.accent_color),
+            ("today_sales", "Today's Sales", self.success_color),
+            ("total_sales", "Total Sales", self.secondary_color),
         ]
-        for i, (title, value, color) in enumerate(stats):
+        self.stat_labels = {}
+        self._stat_text = {}
+        for i, (key, title, color) in enumerate(stats):
             stat_frame = ctk.CTkFrame(stats_frame, border_width=1, corner_radius=8)
             stat_frame.grid(row=0, column=i, padx=10, pady=10, sticky="nsew")
             stats_frame.grid_columnconfigure(i, weight=1)
 
             ctk.CTkLabel(stat_frame, text=title, font=ctk.CTkFont(size=13)).pack(padx=10, pady=(10, 5))
-            ctk.CTkLabel(
-                stat_frame, text=value,
+            self.stat_labels[key] = ctk.CTkLabel(
+                stat_frame, text="…",
                 font=ctk.CTkFont(size=18, weight="bold"),
                 text_color=color
-            ).pack(padx=10, pady=(5, 10))
+            )
+            self.stat_labels[key].pack(padx=10, pady=(5, 10))
+        self.update_stats()
 
         # ===== Recent Activity =====
         activity_frame = ctk.CTkFrame(content_frame, corner_radius=8)
@@ -122,6 +132,35 @@ class MainWindow:
         for activity in activities:
             ctk.CTkLabel(activity_frame, text=f"• {activity}", anchor="w").pack(anchor="w", padx=20, pady=2)
 
+    def update_stats(self):
+        # utils caches the figures for DASHBOARD_TTL (15s), so with no local writes only about one
+        # tick in three runs the aggregate query; the others are served from memory
+        run_async(get_dashboard_stats, key=(self, "stats"), widget=self.master, on_done=self._show_stats)
+        if self._stats_after is not None:
+            self.master.after_cancel(self._stats_after)
+        self._stats_after = self.master.after(STATS_REFRESH_MS, self.update_stats)
+
+    refresh = update_stats
+
+    def pause(self):
+        """Stop polling while WindowManager keeps the window hidden; refresh() restarts it."""
+        if self._stats_after is not None:
+            self.master.after_cancel(self._stats_after)
+            self._stats_after = None
+
+    def _show_stats(self, row):
+        texts = {
+            "medicines": f"{row['medicines']:,}",
+            "low_stock": f"{row['low_stock']:,}",
+            "today_sales": format_currency(row["today_sales"]),
+            "total_sales": format_currency(row["total_sales"]),
+        }
+        for key, text in texts.items():
+            # Reconfiguring a CTk label redraws it; skip the ones that haven't changed
+            if self._stat_text.get(key) != text:
+                self._stat_text[key] = text
+                self.stat_labels[key].configure(text=text)
+
     def update_time(self):
         current_time = time.strftime("%H:%M:%S %p")
         self.time_label.configure(text=current_time)
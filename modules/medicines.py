@@ -1,14 +1,10 @@
 # modules/medicines.py
 #!/usr/bin/env python3
-import faulthandler
-faulthandler.enable()
-
 import customtkinter as ctk
-from tkinter import ttk, messagebox, filedialog
-import csv
-from datetime import datetime, date
+from tkinter import messagebox
 
-from utils import execute_query, fetch_one, fetch_all
+from utils import execute_query, fetch_one, search_medicines, KeysetPager, validate_product, create_product, peek_code
+from widgets import VirtualTreeview, run_import, run_export
 
 
 class MedicinesWindow:
@@ -48,20 +44,6 @@ class MedicinesWindow:
             except Exception as e:
                 print("Seed products failed:", e)
 
-    def get_next_id(self) -> str:
-        row = fetch_one("SELECT id FROM products WHERE id LIKE 'M%' "
-                        "ORDER BY CAST(SUBSTR(id,2) AS INTEGER) DESC LIMIT 1")
-        last_id = None
-        if row:
-            last_id = row.get("id") if isinstance(row, dict) else list(row.values())[0]
-        if not last_id:
-            return "M001"
-        try:
-            num = int(last_id[1:]) + 1
-        except Exception:
-            num = 1
-        return f"M{num:03d}"
-
     # -------------------- UI --------------------
     def setup_ui(self):
         # Header
@@ -84,13 +66,16 @@ class MedicinesWindow:
         ctk.CTkButton(controls, text="Clear", command=self.clear_search).pack(side='left', padx=4)
         ctk.CTkButton(controls, text="Add New", command=self.add_medicine_dialog).pack(side='right', padx=4)
         ctk.CTkButton(controls, text="Export CSV", command=self.export_csv).pack(side='right', padx=4)
+        ctk.CTkButton(controls, text="Import",
+                      command=lambda: run_import(self.master, "products", self.load_medicines)).pack(side='right', padx=4)
 
         # Table container
         container = ctk.CTkFrame(self.master)
         container.pack(fill='both', expand=True, padx=12, pady=6)
 
         columns = ('id', 'name', 'category', 'product_mrp', 'product_expiry')
-        self.tree = ttk.Treeview(container, columns=columns, show='headings', selectmode='browse')
+        self.vlist = VirtualTreeview(container, columns, self._medicine_values, selectmode='browse')
+        self.tree = self.vlist.tree
         headings = {
             'id': 'ID', 'name': 'Medicine Name', 'category': 'Category',
             'product_mrp': 'MRP', 'product_expiry': 'Expiry Date'
@@ -104,10 +89,7 @@ class MedicinesWindow:
         self.tree.column('product_mrp', width=100, anchor='e')
         self.tree.column('product_expiry', width=120, anchor='center')
 
-        vsb = ttk.Scrollbar(container, orient='vertical', command=self.tree.yview)
-        self.tree.configure(yscrollcommand=vsb.set)
-        self.tree.pack(side='left', fill='both', expand=True)
-        vsb.pack(side='right', fill='y')
+        self.vlist.pack(fill='both', expand=True)
 
         self.tree.bind("<Double-1>", lambda e: self.edit_selected())
 
@@ -119,23 +101,22 @@ class MedicinesWindow:
 
     # -------------------- Data load --------------------
     def load_medicines(self, search_query=""):
-        self.tree.delete(*self.tree.get_children())
+        # A newer search supersedes (and interrupts) one still running
         if search_query:
-            like = f"%{search_query}%"
-            rows = fetch_all(
-                "SELECT id,name,category,product_mrp,product_expiry FROM products "
-                "WHERE name LIKE ? OR category LIKE ? ORDER BY id ASC", (like, like)
-            )
+            # Ranked results are capped, so they are shown as one list
+            self.vlist.show_results(search_medicines, search_query, 500)
         else:
-            rows = fetch_all("SELECT id,name,category,product_mrp,product_expiry FROM products ORDER BY id ASC")
+            self.vlist.set_pager(KeysetPager(
+                "SELECT id,name,category,product_mrp,product_expiry FROM products", ("id",)))
 
-        for row in rows:
-            if isinstance(row, dict):
-                display = (row.get("id"), row.get("name"), row.get("category"),
-                           f"{float(row.get('product_mrp',0)):.2f}", row.get("product_expiry"))
-            else:
-                display = (row[0], row[1], row[2], f"{float(row[3]):.2f}", row[4])
-            self.tree.insert('', 'end', values=display)
+    @staticmethod
+    def _medicine_values(row):
+        return (row["id"], row["name"], row["category"],
+                f"{float(row['product_mrp'] or 0):.2f}", row["product_expiry"])
+
+    def refresh(self):
+        # Re-shown by the window manager: reload, keeping the current search
+        self.search_medicines()
 
     def clear_search(self):
         self.search_entry.delete(0, 'end')
@@ -170,8 +151,8 @@ class MedicinesWindow:
             entries["MRP"].insert(0, values["product_mrp"])
             entries["Expiry"].insert(0, values["product_expiry"])
         else:
-            new_id = self.get_next_id()
-            entries["ID"].insert(0, new_id)
+            # The code is allocated on save; this shows what it will be unless another terminal saves first
+            entries["ID"].insert(0, peek_code("product"))
             entries["ID"].configure(state="disabled")
 
         btn_frame = ctk.CTkFrame(dialog, fg_color="transparent")
@@ -196,37 +177,23 @@ class MedicinesWindow:
 
     # -------------------- Validation & CRUD --------------------
     def _validate(self, name, category, price_str, expiry_str):
-        if not name.strip(): return "Name is required."
-        if not category.strip(): return "Category is required."
-        try:
-            price = float(price_str)
-            if price < 0: return "Price must be ≥ 0."
-        except Exception:
-            return "Price must be a number."
-        try:
-            datetime.strptime(expiry_str, "%Y-%m-%d")
-        except Exception:
-            return "Expiry must be in YYYY-MM-DD format."
-        return None
+        # Shared with the bulk importer, so imported rows meet the same rules as typed ones
+        return validate_product(name, category, price_str, expiry_str)
 
     def _save_new(self, entries, dialog):
-        med_id = entries["ID"].get()
         name = entries["Name"].get()
         category = entries["Category"].get()
         product_mrp = entries["MRP"].get()
-        product_expiry = entries["Expiry (YYYY-MM-DD)"].get()
+        product_expiry = entries["Expiry"].get()
         err = self._validate(name, category, product_mrp, product_expiry)
         if err:
             messagebox.showerror("Validation", err)
             return
         try:
-            execute_query(
-                "INSERT INTO products (id,name,category,product_mrp,product_expiry) VALUES (?,?,?,?,?)",
-                (med_id, name.strip(), category.strip(), float(product_mrp), product_expiry)
-            )
+            med_id = create_product(name.strip(), category.strip(), float(product_mrp), product_expiry)
             self.load_medicines()
             dialog.destroy()
-            messagebox.showinfo("Saved", "Product added successfully.")
+            messagebox.showinfo("Saved", f"Product {med_id} added successfully.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -235,7 +202,7 @@ class MedicinesWindow:
         name = entries["Name"].get()
         category = entries["Category"].get()
         product_mrp = entries["MRP"].get()
-        product_expiry = entries["Expiry (YYYY-MM-DD)"].get()
+        product_expiry = entries["Expiry"].get()
         err = self._validate(name, category, product_mrp, product_expiry)
         if err:
             messagebox.showerror("Validation", err)
@@ -267,20 +234,4 @@ class MedicinesWindow:
             messagebox.showerror("Error", str(e))
 
     def export_csv(self):
-        file_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
-        if not file_path:
-            return
-        try:
-            rows = fetch_all("SELECT id,name,category,product_mrp,product_expiry FROM products ORDER BY id ASC")
-            with open(file_path, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["ID", "Name", "Category", "MRP", "Expiry"])
-                for r in rows:
-                    if isinstance(r, dict):
-                        writer.writerow([r.get("id"), r.get("name"), r.get("category"),
-                                         f"{float(r.get('product_mrp',0)):.2f}", r.get("product_expiry")])
-                    else:
-                        writer.writerow([r[0], r[1], r[2], f"{float(r[3]):.2f}", r[4]])
-            messagebox.showinfo("Export", "Exported successfully")
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        run_export(self.master, "medicines")
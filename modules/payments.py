@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils import fetch_all, record_payment, format_currency
+from utils import fetch_all, record_payment, format_currency, KeysetPager
+from db_worker import run_async
+from widgets import VirtualTreeview, run_export
 
 class PaymentsWindow:
     def __init__(self, root, app):
@@ -31,24 +33,41 @@ class PaymentsWindow:
 
         ttk.Button(top, text="Record Payment", command=self.save_payment).pack(side=tk.RIGHT)
 
-        self.tree = ttk.Treeview(root, columns=("id","bill","amount","method","date","ref"), show="headings", height=14)
+        exports = ttk.Frame(root, padding=(8, 0)); exports.pack(fill=tk.X)
+        ttk.Button(exports, text="Export Payments", command=lambda: run_export(self.root, "payments")).pack(side=tk.LEFT)
+        ttk.Button(exports, text="Export Bills", command=lambda: run_export(self.root, "bills")).pack(side=tk.LEFT, padx=6)
+
+        self.vlist = VirtualTreeview(root, ("id","bill","amount","method","date","ref"), self._payment_values, height=14)
+        self.tree = self.vlist.tree
         for c,w in (("id",60),("bill",80),("amount",100),("method",100),("date",160),("ref",140)):
             self.tree.heading(c, text=c.capitalize()); self.tree.column(c, width=w, stretch=True)
-        self.tree.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+        self.vlist.pack(fill=tk.BOTH, expand=True, padx=8, pady=8)
+
+        self.load_bills(); self.load_payments()
 
+    def refresh(self):
         self.load_bills(); self.load_payments()
 
     def load_bills(self):
-        rows = fetch_all("""
-            SELECT id, bill_date, total_amount, payment_status FROM bills ORDER BY bill_date DESC, id DESC LIMIT 200
-        """)
-        self.bill_cb["values"] = [f"{r['id']} - {r['bill_date']} - {format_currency(r['total_amount'])} ({r['payment_status']})" for r in rows]
+        run_async(fetch_all, """
+            SELECT id, bill_date, total_amount, balance_due, payment_status FROM bills ORDER BY bill_date DESC, id DESC LIMIT 200
+        """, key=(self, "bills"), widget=self.bill_cb, on_done=self._fill_bills, on_error=self._show_db_error)
+
+    def _fill_bills(self, rows):
+        self.bill_cb["values"] = [f"{r['id']} - {r['bill_date']} - {format_currency(r['total_amount'])} "
+                                  f"({r['payment_status']}, due {format_currency(r['balance_due'])})" for r in rows]
 
     def load_payments(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        rows = fetch_all("SELECT id, bill_id as bill, amount, method, payment_date as date, reference as ref FROM payments ORDER BY payment_date DESC")
-        for r in rows:
-            self.tree.insert("", tk.END, values=(r["id"], r["bill"], format_currency(r["amount"]), r["method"], r["date"], r.get("ref","")))
+        self.vlist.set_pager(KeysetPager(
+            "SELECT id, bill_id as bill, amount, method, payment_date as date, reference as ref FROM payments",
+            ("date", "id"), descending=True))
+
+    @staticmethod
+    def _payment_values(r):
+        return (r["id"], r["bill"], format_currency(r["amount"]), r["method"], r["date"], r.get("ref",""))
+
+    def _show_db_error(self, exc):
+        messagebox.showerror("DB Error", str(exc), parent=self.root)
 
     def save_payment(self):
         if not self.bill_var.get(): return messagebox.showerror("Validation", "Select a bill")
@@ -1,8 +1,12 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils import fetch_all, execute_query
+from utils import get_reference, suggest_customers, execute_query
+from db_worker import run_async
+from widgets import MedicinePicker
 
 class PrescriptionsWindow:
+    SEARCH_DEBOUNCE_MS = 200
+
     def __init__(self, root, app):
         self.app = app
         self.root = root
@@ -12,8 +16,12 @@ class PrescriptionsWindow:
         header = ttk.Frame(root, padding=8); header.pack(fill=tk.X)
         ttk.Label(header, text="Customer:").pack(side=tk.LEFT)
         self.customer_var = tk.StringVar()
-        self.customer_cb = ttk.Combobox(header, textvariable=self.customer_var, state="readonly", width=40)
+        # Too many customers to list: type a name prefix or phone number, then pick a match
+        self.customer_cb = ttk.Combobox(header, textvariable=self.customer_var, width=40)
         self.customer_cb.pack(side=tk.LEFT, padx=6)
+        self.customer_cb.bind("<KeyRelease>", self._on_customer_key)
+        self._customers = {}  # combobox text -> customer id
+        self._search_after = None
 
         ttk.Label(header, text="Doctor:").pack(side=tk.LEFT)
         self.doctor_var = tk.StringVar()
@@ -38,23 +46,43 @@ class PrescriptionsWindow:
         self.load_refs()
 
     def load_refs(self):
-        customers = fetch_all("SELECT id, name FROM customers ORDER BY name")
-        doctors = fetch_all("SELECT id, name FROM doctors ORDER BY name")
-        self.customer_cb["values"] = [f"{c['id']} - {c['name']}" for c in customers]
+        run_async(get_reference, "doctors", key=(self, "refs"), widget=self.doctor_cb, on_done=self._fill_refs,
+                  on_error=lambda e: messagebox.showerror("DB Error", str(e), parent=self.root))
+
+    def _fill_refs(self, doctors):
         self.doctor_cb["values"] = [f"{d['id']} - {d['name']}" for d in doctors]
-        self.medicines = fetch_all("SELECT id, name FROM medicines ORDER BY name")
+
+    refresh = load_refs
+
+    def _on_customer_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Tab", "Escape"):
+            return
+        if self._search_after is not None:
+            self.root.after_cancel(self._search_after)
+        self._search_after = self.root.after(self.SEARCH_DEBOUNCE_MS, self._search_customers)
+
+    def _search_customers(self):
+        self._search_after = None
+        term = self.customer_var.get()
+        if term in self._customers:
+            return
+        run_async(suggest_customers, term, key=(self, "customers"), widget=self.customer_cb,
+                  on_done=self._fill_customers,
+                  on_error=lambda e: messagebox.showerror("DB Error", str(e), parent=self.root))
+
+    def _fill_customers(self, rows):
+        self._customers = {f"{c['id']} - {c['name']}" + (f" ({c['phone']})" if c["phone"] else ""): c["id"]
+                           for c in rows}
+        self.customer_cb["values"] = list(self._customers)
 
     def add_item_dialog(self):
-        if not self.medicines:
-            return messagebox.showinfo("Prescriptions", "No medicines available.")
         win = tk.Toplevel(self.root); win.title("Add RX Item")
         frm = ttk.Frame(win, padding=8); frm.pack(fill=tk.BOTH, expand=True)
 
-        ttk.Label(frm, text="Medicine:").grid(row=0, column=0, sticky="w")
-        med_var = tk.StringVar()
-        med_cb = ttk.Combobox(frm, textvariable=med_var, state="readonly", width=40,
-                              values=[f"{m['id']} - {m['name']}" for m in self.medicines])
-        med_cb.grid(row=0, column=1, sticky="ew", padx=6)
+        ttk.Label(frm, text="Medicine:").grid(row=0, column=0, sticky="nw")
+        picker = MedicinePicker(frm)
+        picker.grid(row=0, column=1, sticky="ew", padx=6)
+        picker.focus_set()
 
         ttk.Label(frm, text="Dosage:").grid(row=1, column=0, sticky="w")
         dose_var = tk.StringVar(); ttk.Entry(frm, textvariable=dose_var).grid(row=1, column=1, sticky="ew", padx=6)
@@ -65,9 +93,8 @@ class PrescriptionsWindow:
         frm.columnconfigure(1, weight=1)
 
         def add():
-            if not med_var.get(): return messagebox.showerror("Validation", "Select medicine.")
-            mid = med_var.get().split(" - ")[0]
-            name = next((m["name"] for m in self.medicines if m["id"] == mid), mid)
+            if picker.selected is None: return messagebox.showerror("Validation", "Select medicine.")
+            mid, name = picker.selected["id"], picker.selected["name"]
             self.items.insert("", tk.END, values=(name, dose_var.get().strip(), dur_var.get().strip(), mid))
             win.destroy()
 
@@ -80,8 +107,8 @@ class PrescriptionsWindow:
         for s in sel: self.items.delete(s)
 
     def save_rx(self):
-        if not self.customer_var.get(): return messagebox.showerror("Validation", "Select customer")
-        cid = int(self.customer_var.get().split(" - ")[0])
+        cid = self._customers.get(self.customer_var.get())
+        if cid is None: return messagebox.showerror("Validation", "Select customer")
         did = None
         if self.doctor_var.get():
             did = int(self.doctor_var.get().split(" - ")[0])
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils import fetch_all, create_purchase, format_currency
+from utils import get_reference, create_purchase, format_currency
+from db_worker import run_async
+from widgets import MedicinePicker
 
 class PurchasesWindow:
     def __init__(self, root, app):
@@ -42,39 +44,40 @@ class PurchasesWindow:
         self.load_suppliers()
 
     def load_suppliers(self):
-        rows = fetch_all("SELECT id, name FROM suppliers ORDER BY name")
+        run_async(get_reference, "suppliers", key=(self, "suppliers"),
+                  widget=self.supplier_cb, on_done=self._fill_suppliers,
+                  on_error=lambda e: messagebox.showerror("DB Error", str(e), parent=self.root))
+
+    def _fill_suppliers(self, rows):
         self.suppliers = rows
         self.supplier_cb["values"] = [f"{r['id']} - {r['name']}" for r in rows]
 
-    def add_item_dialog(self):
-        medicines = fetch_all("SELECT id, name, price FROM medicines ORDER BY name")
-        if not medicines:
-            return messagebox.showinfo("Purchases", "No medicines found. Add medicines first.")
+    refresh = load_suppliers
 
+    def add_item_dialog(self):
         win = tk.Toplevel(self.root); win.title("Add Item")
         frm = ttk.Frame(win, padding=8); frm.pack(fill=tk.BOTH, expand=True)
 
-        ttk.Label(frm, text="Medicine:").grid(row=0, column=0, sticky="w")
-        med_var = tk.StringVar()
-        med_cb = ttk.Combobox(frm, textvariable=med_var, state="readonly", width=40,
-                              values=[f"{m['id']} - {m['name']}" for m in medicines])
-        med_cb.grid(row=0, column=1, sticky="ew", padx=6)
+        ttk.Label(frm, text="Medicine:").grid(row=0, column=0, sticky="nw")
+        # Default the price to the product's purchase price once one is picked
+        picker = MedicinePicker(frm, on_select=lambda m: price_var.set(str(m["product_price"])))
+        picker.grid(row=0, column=1, sticky="ew", padx=6)
+        picker.focus_set()
 
         ttk.Label(frm, text="Quantity:").grid(row=1, column=0, sticky="w")
         qty_var = tk.StringVar(value="1")
         ttk.Entry(frm, textvariable=qty_var).grid(row=1, column=1, sticky="ew", padx=6)
 
         ttk.Label(frm, text="Price (per unit):").grid(row=2, column=0, sticky="w")
-        price_var = tk.StringVar(value=str(medicines[0]["price"] if medicines else "0"))
+        price_var = tk.StringVar(value="0")
         ttk.Entry(frm, textvariable=price_var).grid(row=2, column=1, sticky="ew", padx=6)
 
         frm.columnconfigure(1, weight=1)
 
         def add():
-            if not med_var.get():
+            if picker.selected is None:
                 return messagebox.showerror("Validation", "Select medicine.")
-            mid = med_var.get().split(" - ")[0]
-            name = next((m["name"] for m in medicines if m["id"] == mid), mid)
+            mid, name = picker.selected["id"], picker.selected["name"]
             try:
                 qty = int(qty_var.get()); price = float(price_var.get())
                 if qty <= 0 or price < 0: raise ValueError()
@@ -2,6 +2,9 @@ from tkinter import ttk, messagebox, scrolledtext
 from tkinter import font as tkfont
 from datetime import datetime, timedelta
 
+from db_worker import run_async
+from report_engine import REPORTS, build_report
+
 class ReportsWindow:
     def __init__(self, master, app):
         self.master = master
@@ -30,76 +33,51 @@ class ReportsWindow:
         
         ttk.Label(report_frame, text="Select Report:").pack(side='left')
         
-        report_combo = ttk.Combobox(report_frame, width=20, state='readonly')
-        report_combo.pack(side='left', padx=5)
-        report_combo['values'] = (
-            'Sales Report', 
-            'Inventory Report', 
-            'Expiry Report', 
-            'Customer Sales', 
-            'Top Selling Items'
-        )
-        report_combo.set('Sales Report')
+        self.report_combo = ttk.Combobox(report_frame, width=20, state='readonly')
+        self.report_combo.pack(side='left', padx=5)
+        self.report_combo['values'] = tuple(REPORTS)
+        self.report_combo.set('Sales Report')
         
         ttk.Label(report_frame, text="Date Range:").pack(side='left', padx=(20, 5))
         
-        start_date = ttk.Entry(report_frame, width=12)
-        start_date.pack(side='left', padx=5)
-        start_date.insert(0, "2024-01-01")
+        self.start_date = ttk.Entry(report_frame, width=12)
+        self.start_date.pack(side='left', padx=5)
+        self.start_date.insert(0, "2024-01-01")
         
         ttk.Label(report_frame, text="to").pack(side='left', padx=5)
         
-        end_date = ttk.Entry(report_frame, width=12)
-        end_date.pack(side='left', padx=5)
-        end_date.insert(0, datetime.now().strftime("%Y-%m-%d"))
+        self.end_date = ttk.Entry(report_frame, width=12)
+        self.end_date.pack(side='left', padx=5)
+        self.end_date.insert(0, datetime.now().strftime("%Y-%m-%d"))
         
-        generate_btn = ttk.Button(report_frame, text="Generate Report", style='Primary.TButton')
+        generate_btn = ttk.Button(report_frame, text="Generate Report", style='Primary.TButton',
+                                  command=self.generate_report)
         generate_btn.pack(side='left', padx=10)
         
         export_btn = ttk.Button(report_frame, text="Export to PDF")
         export_btn.pack(side='right')
         
         # Report display area
-        report_display = scrolledtext.ScrolledText(self.master, width=80, height=20)
-        report_display.pack(fill='both', expand=True, padx=20, pady=10)
-        
-        # Sample report content
-        report_content = """
-                                SALES REPORT
-                                ============
-        
-        Period: 2024-01-01 to 2024-03-15
-        
-        Summary:
-        - Total Sales: $12,580.00
-        - Number of Transactions: 248
-        - Average Transaction Value: $50.73
-        - Most Sold Item: Paracetamol (320 units)
-        
-        Daily Sales Breakdown:
-        Date          Sales     Transactions
-        2024-03-15    $1,240.00   24
-        2024-03-14    $1,180.50   22
-        2024-03-13    $1,050.75   20
-        2024-03-12    $980.25     19
-        
-        Category Performance:
-        Category          Sales      % of Total
-        Pain Relief       $4,520.00   35.9%
-        Antibiotics       $3,150.00   25.0%
-        Supplements       $1,880.00   14.9%
-        Digestive         $1,250.00   9.9%
-        Allergy           $980.00     7.8%
-        Diabetes          $800.00     6.4%
-        
-        Top Selling Items:
-        Item            Units Sold   Revenue
-        Paracetamol     320          $1,920.00
-        Amoxicillin     215          $2,687.50
-        Vitamin C       180          $1,575.00
-        Ibuprofen       175          $1,093.75
-        Omeprazole      120          $1,836.00
-        """
-        
-        report_display.insert('1.0', report_content)
-        report_display.config(state='disabled')  # Make it read-only
\ No newline at end of file
+        self.report_display = scrolledtext.ScrolledText(self.master, width=80, height=20,
+                                                        font=tkfont.Font(family="Courier", size=10))
+        self.report_display.pack(fill='both', expand=True, padx=20, pady=10)
+        self.report_display.config(state='disabled')  # Make it read-only
+
+        self.generate_report()
+
+    def generate_report(self):
+        self.show_text("Generating report...")
+        # Picking another report or range while one runs supersedes (and interrupts) it
+        run_async(build_report, self.report_combo.get(), self.start_date.get(), self.end_date.get(),
+                  key=(self, "report"), widget=self.report_display, on_done=self.show_text,
+                  on_error=self._report_failed)
+
+    def _report_failed(self, exc):
+        self.show_text("")
+        messagebox.showerror("Report", str(exc), parent=self.master)
+
+    def show_text(self, text):
+        self.report_display.config(state='normal')
+        self.report_display.delete('1.0', 'end')
+        self.report_display.insert('1.0', text)
+        self.report_display.config(state='disabled')
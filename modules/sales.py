@@ -3,6 +3,13 @@ from tkinter import ttk, messagebox, scrolledtext
 from tkinter import font as tkfont
 from datetime import datetime, timedelta
 
+from catalog import product_index
+from db_worker import run_async
+from utils import InsufficientStockError, checkout, fetch_one, format_currency
+from widgets import MedicinePicker, run_export
+
+PAYMENT_METHODS = ("cash", "card", "upi", "insurance")
+CATALOGUE_SYNC_MS = 30000
 
 
 class SalesWindow:
@@ -12,6 +19,7 @@ class SalesWindow:
         self.master.title("Sales Management")
         self.master.geometry("900x600")
         self.master.configure(bg='#f5f5f5')
+        self._sync_after = None
         
         self.setup_ui()
     
@@ -45,6 +53,12 @@ class SalesWindow:
         self.setup_sales_history_tab(sales_history_tab)
     
     def setup_new_sale_tab(self, parent):
+        self.cart = {}              # product id -> {"entry", "quantity", "price"}
+        self.customer_id = None     # None sells to a walk-in customer
+        self._customer_phone = ""   # the phone customer_id was looked up for
+        self._customer_lookup = False
+        self._checking_out = False
+
         # Form frame
         form_frame = ttk.Frame(parent)
         form_frame.pack(fill='x', padx=20, pady=10)
@@ -53,35 +67,40 @@ class SalesWindow:
         ttk.Label(form_frame, text="Customer Information", font=tkfont.Font(weight='bold')).grid(
             row=0, column=0, columnspan=2, pady=10, sticky='w')
         
-        ttk.Label(form_frame, text="Name:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
-        customer_name = ttk.Entry(form_frame, width=30)
-        customer_name.grid(row=1, column=1, padx=5, pady=5, sticky='w')
+        ttk.Label(form_frame, text="Phone:").grid(row=1, column=0, padx=5, pady=5, sticky='e')
+        self.customer_phone = ttk.Entry(form_frame, width=20)
+        self.customer_phone.grid(row=1, column=1, padx=5, pady=5, sticky='w')
+        self.customer_phone.bind("<Return>", lambda e: self.find_customer())
+        self.customer_phone.bind("<FocusOut>", lambda e: self.find_customer())
         
-        ttk.Label(form_frame, text="Phone:").grid(row=2, column=0, padx=5, pady=5, sticky='e')
-        customer_phone = ttk.Entry(form_frame, width=20)
-        customer_phone.grid(row=2, column=1, padx=5, pady=5, sticky='w')
+        ttk.Label(form_frame, text="Name:").grid(row=2, column=0, padx=5, pady=5, sticky='e')
+        self.customer_name = ttk.Label(form_frame, text="Walk-in", width=30)
+        self.customer_name.grid(row=2, column=1, padx=5, pady=5, sticky='w')
         
         # Medicine selection
         ttk.Label(form_frame, text="Select Medicine", font=tkfont.Font(weight='bold')).grid(
             row=3, column=0, columnspan=2, pady=(20, 10), sticky='w')
         
-        ttk.Label(form_frame, text="Medicine:").grid(row=4, column=0, padx=5, pady=5, sticky='e')
-        medicine_combo = ttk.Combobox(form_frame, width=27, state='readonly')
-        medicine_combo.grid(row=4, column=1, padx=5, pady=5, sticky='w')
-        medicine_combo['values'] = ('Paracetamol', 'Amoxicillin', 'Vitamin C', 'Ibuprofen', 'Omeprazole')
+        ttk.Label(form_frame, text="Medicine:").grid(row=4, column=0, padx=5, pady=5, sticky='ne')
+        # Searches the in-memory catalogue, so a scanned barcode + Enter picks at once
+        self.medicine_picker = MedicinePicker(form_frame, on_select=self._on_medicine, height=5,
+                                              lookup=product_index.suggest)
+        self.medicine_picker.grid(row=4, column=1, padx=5, pady=5, sticky='w')
         
         ttk.Label(form_frame, text="Quantity:").grid(row=5, column=0, padx=5, pady=5, sticky='e')
-        quantity_spin = ttk.Spinbox(form_frame, from_=1, to=100, width=10)
-        quantity_spin.grid(row=5, column=1, padx=5, pady=5, sticky='w')
-        quantity_spin.set(1)
+        self.quantity_spin = ttk.Spinbox(form_frame, from_=1, to=100, width=10)
+        self.quantity_spin.grid(row=5, column=1, padx=5, pady=5, sticky='w')
+        self.quantity_spin.set(1)
+        self.quantity_spin.bind("<Return>", lambda e: self.add_to_cart())
         
         ttk.Label(form_frame, text="Price:").grid(row=6, column=0, padx=5, pady=5, sticky='e')
-        price_entry = ttk.Entry(form_frame, width=15, state='readonly')
-        price_entry.grid(row=6, column=1, padx=5, pady=5, sticky='w')
-        price_entry.insert(0, "$0.00")
+        self.price_entry = ttk.Entry(form_frame, width=15)
+        self.price_entry.grid(row=6, column=1, padx=5, pady=5, sticky='w')
+        self.price_entry.insert(0, format_currency(0))
+        self.price_entry.configure(state='readonly')
         
         # Add to cart button
-        add_btn = ttk.Button(form_frame, text="Add to Cart", style='Primary.TButton')
+        add_btn = ttk.Button(form_frame, text="Add to Cart", style='Primary.TButton', command=self.add_to_cart)
         add_btn.grid(row=7, column=1, padx=5, pady=10, sticky='w')
         
         # Cart frame
@@ -90,32 +109,199 @@ class SalesWindow:
         
         # Cart treeview
         columns = ('medicine', 'quantity', 'price', 'total')
-        cart_tree = ttk.Treeview(cart_frame, columns=columns, show='headings', height=6)
+        self.cart_tree = ttk.Treeview(cart_frame, columns=columns, show='headings', height=6)
         
-        cart_tree.heading('medicine', text='Medicine')
-        cart_tree.heading('quantity', text='Quantity')
-        cart_tree.heading('price', text='Unit Price')
-        cart_tree.heading('total', text='Total')
+        self.cart_tree.heading('medicine', text='Medicine')
+        self.cart_tree.heading('quantity', text='Quantity')
+        self.cart_tree.heading('price', text='Unit Price')
+        self.cart_tree.heading('total', text='Total')
         
-        cart_tree.column('medicine', width=200)
-        cart_tree.column('quantity', width=100, anchor='center')
-        cart_tree.column('price', width=100, anchor='e')
-        cart_tree.column('total', width=100, anchor='e')
+        self.cart_tree.column('medicine', width=200)
+        self.cart_tree.column('quantity', width=100, anchor='center')
+        self.cart_tree.column('price', width=100, anchor='e')
+        self.cart_tree.column('total', width=100, anchor='e')
         
-        cart_tree.pack(fill='both', expand=True)
+        self.cart_tree.pack(fill='both', expand=True)
+        self.cart_tree.bind("<Delete>", lambda e: self.remove_from_cart())
         
         # Total frame
         total_frame = ttk.Frame(cart_frame)
         total_frame.pack(fill='x', pady=10)
         
         ttk.Label(total_frame, text="Grand Total:", font=tkfont.Font(weight='bold')).pack(side='left')
-        total_label = ttk.Label(total_frame, text="$0.00", font=tkfont.Font(weight='bold'))
-        total_label.pack(side='left', padx=5)
-        
-        # Checkout button
-        checkout_btn = ttk.Button(cart_frame, text="Process Payment", style='Success.TButton')
-        checkout_btn.pack(pady=10)
+        self.total_label = ttk.Label(total_frame, text=format_currency(0), font=tkfont.Font(weight='bold'))
+        self.total_label.pack(side='left', padx=5)
+        ttk.Button(total_frame, text="Remove Selected", command=self.remove_from_cart).pack(side='right')
+        
+        # Payment and checkout
+        pay_frame = ttk.Frame(cart_frame)
+        pay_frame.pack(pady=10)
+        ttk.Label(pay_frame, text="Payment Method:").pack(side='left')
+        self.method_var = tk.StringVar(value="cash")
+        ttk.Combobox(pay_frame, textvariable=self.method_var, values=PAYMENT_METHODS, width=10,
+                     state='readonly').pack(side='left', padx=5)
+        self.checkout_btn = ttk.Button(pay_frame, text="Process Payment", style='Success.TButton',
+                                       command=self.process_payment)
+        self.checkout_btn.pack(side='left', padx=10)
+
+        self.sync_catalogue()
+
+    # ---------- catalogue ----------
+
+    def sync_catalogue(self):
+        """Load the product index once, then pick up changes (other terminals' sales, new products)."""
+        if not self.master.winfo_exists():
+            return
+        run_async(product_index.sync, key=(product_index, "sync"), widget=self.cart_tree)
+        if self._sync_after is not None:
+            self.master.after_cancel(self._sync_after)
+        self._sync_after = self.master.after(CATALOGUE_SYNC_MS, self.sync_catalogue)
+
+    def refresh(self):
+        self.sync_catalogue()
+
+    def pause(self):
+        """Stop the periodic sync while WindowManager keeps the window hidden; refresh() restarts it."""
+        if self._sync_after is not None:
+            self.master.after_cancel(self._sync_after)
+            self._sync_after = None
+
+    # ---------- customer ----------
+
+    def find_customer(self, then=None):
+        """Look up the customer for the phone entered; `then()` runs once it is known."""
+        phone = self.customer_phone.get().strip()
+        if not phone:
+            self._set_customer(None)
+            return then() if then else None
+        if phone == self._customer_phone and not self._customer_lookup:
+            return then() if then else None
+        # Checkout waits for the lookup, so a sale can't go to the previous customer
+        self._customer_lookup = True
+        self._update_checkout_state()
+        run_async(fetch_one, "SELECT id, name FROM customers WHERE phone = ? ORDER BY id LIMIT 1", (phone,),
+                  key=(self, "customer"), widget=self.customer_name,
+                  on_done=lambda row: self._customer_found(row, phone, then),
+                  on_error=self._customer_lookup_failed)
+
+    def _customer_found(self, row, phone, then):
+        self._customer_lookup = False
+        self._set_customer(row, phone)
+        self._update_checkout_state()
+        if then:
+            then()
+
+    def _customer_lookup_failed(self, exc):
+        self._customer_lookup = False
+        self._update_checkout_state()
+        messagebox.showerror("Customer", str(exc), parent=self.master)
+
+    def _set_customer(self, row, phone: str = ""):
+        self.customer_id = row["id"] if row else None
+        self._customer_phone = phone
+        self.customer_name.configure(text=row["name"] if row else "Walk-in")
+
+    # ---------- cart ----------
+
+    def _on_medicine(self, medicine):
+        self._show_price(self.price_entry, medicine)
+        self.quantity_spin.focus_set()
+        self.quantity_spin.selection_range(0, 'end')
+
+    def add_to_cart(self):
+        medicine = self.medicine_picker.selected
+        if medicine is None:
+            messagebox.showwarning("Cart", "Select a medicine first.", parent=self.master)
+            return
+        try:
+            qty = int(self.quantity_spin.get())
+            if qty <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showwarning("Cart", "Quantity must be a positive whole number.", parent=self.master)
+            return
+        line = self.cart.get(medicine["id"])
+        in_cart = line["quantity"] if line else 0
+        if in_cart + qty > medicine["stock"]:
+            messagebox.showwarning("Cart", f"Only {medicine['stock']} of {medicine['name']} in stock.",
+                                   parent=self.master)
+            return
+        if line is None:
+            line = self.cart[medicine["id"]] = {"entry": medicine, "quantity": 0,
+                                                "price": float(medicine["product_mrp"] or 0)}
+        line["quantity"] += qty
+        values = (f"{medicine['name']} ({medicine['id']})", line["quantity"], format_currency(line["price"]),
+                  format_currency(line["quantity"] * line["price"]))
+        if self.cart_tree.exists(medicine["id"]):
+            self.cart_tree.item(medicine["id"], values=values)
+        else:
+            self.cart_tree.insert('', 'end', iid=medicine["id"], values=values)
+        self._update_total()
+        self.medicine_picker.clear()
+        self.quantity_spin.set(1)
+        self.medicine_picker.focus_set()
+
+    def remove_from_cart(self):
+        for iid in self.cart_tree.selection():
+            self.cart.pop(iid, None)
+            self.cart_tree.delete(iid)
+        self._update_total()
+
+    def _update_total(self):
+        self.total_label.configure(text=format_currency(sum(l["quantity"] * l["price"] for l in self.cart.values())))
+
+    def _clear_sale(self):
+        self.cart.clear()
+        self.cart_tree.delete(*self.cart_tree.get_children())
+        self._update_total()
+        self.customer_phone.delete(0, 'end')
+        self._set_customer(None)
+
+    # ---------- checkout ----------
+
+    def _update_checkout_state(self):
+        busy = self._customer_lookup or self._checking_out
+        self.checkout_btn.configure(state='disabled' if busy else 'normal')
+
+    def process_payment(self):
+        if not self.cart:
+            messagebox.showwarning("Checkout", "The cart is empty.", parent=self.master)
+            return
+        if self._customer_lookup or self._checking_out:
+            return
+        if self.customer_phone.get().strip() != self._customer_phone:
+            # Phone edited but not looked up yet (no Return / focus change): resolve it first
+            return self.find_customer(then=self.process_payment)
+        items = [{"medicine_id": mid, "quantity": l["quantity"], "price": l["price"]} for mid, l in self.cart.items()]
+        self._checking_out = True
+        self._update_checkout_state()
+        # Bill, stock and full payment commit together in one call
+        run_async(checkout, self.customer_id, items, self.method_var.get(), key=(self, "checkout"),
+                  widget=self.checkout_btn, on_done=lambda bill: self._checkout_done(bill, items),
+                  on_error=self._checkout_failed)
+
+    def _checkout_done(self, bill, items):
+        self._checking_out = False
+        self._update_checkout_state()
+        product_index.apply_sale({it["medicine_id"]: it["quantity"] for it in items})
+        self._clear_sale()
+        messagebox.showinfo("Checkout", f"Bill {bill['bill_no']} paid: {format_currency(bill['total_amount'])}",
+                            parent=self.master)
+
+    def _checkout_failed(self, exc):
+        self._checking_out = False
+        self._update_checkout_state()
+        if isinstance(exc, InsufficientStockError):
+            product_index.set_stock(exc.medicine_id, exc.available or 0)
+        messagebox.showerror("Checkout", str(exc), parent=self.master)
     
+    @staticmethod
+    def _show_price(entry, medicine):
+        entry.configure(state='normal')
+        entry.delete(0, 'end')
+        entry.insert(0, format_currency(medicine["product_mrp"]))
+        entry.configure(state='readonly')
+
     def setup_sales_history_tab(self, parent):
         # Filter frame
         filter_frame = ttk.Frame(parent)
@@ -136,7 +322,7 @@ class SalesWindow:
         filter_btn = ttk.Button(filter_frame, text="Apply Filter", style='Primary.TButton')
         filter_btn.pack(side='left', padx=10)
         
-        export_btn = ttk.Button(filter_frame, text="Export Report")
+        export_btn = ttk.Button(filter_frame, text="Export Report", command=lambda: run_export(self.master, "bills"))
         export_btn.pack(side='right')
         
         # Sales history treeview
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils import fetch_all, execute_query
+from utils import fetch_all, execute_query, KeysetPager
+from widgets import VirtualTreeview, run_export
 
 class SuppliersWindow:
     def __init__(self, root, app):
@@ -18,19 +19,26 @@ class SuppliersWindow:
         ttk.Button(toolbar, text="Edit", command=self.edit).pack(side=tk.LEFT, padx=4)
         ttk.Button(toolbar, text="Delete", command=self.delete).pack(side=tk.LEFT, padx=4)
         ttk.Button(toolbar, text="Refresh", command=self.load).pack(side=tk.LEFT, padx=4)
+        ttk.Button(toolbar, text="Export", command=lambda: run_export(self.root, "suppliers")).pack(side=tk.LEFT, padx=4)
 
-        self.tree = ttk.Treeview(top, columns=("id","name","contact","phone","email"), show="headings", height=18)
+        self.vlist = VirtualTreeview(top, ("id","name","contact","phone","email"), self._values, height=18)
+        self.tree = self.vlist.tree
         for c,w in (("id",60),("name",180),("contact",160),("phone",120),("email",180)):
             self.tree.heading(c, text=c.capitalize())
             self.tree.column(c, width=w, stretch=True)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.vlist.pack(fill=tk.BOTH, expand=True)
         self.load()
 
     def load(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        rows = fetch_all("SELECT id, name, contact_person as contact, phone, email FROM suppliers ORDER BY created_at DESC")
-        for r in rows:
-            self.tree.insert("", tk.END, values=(r["id"], r["name"], r.get("contact",""), r.get("phone",""), r.get("email","")))
+        self.vlist.set_pager(KeysetPager(
+            "SELECT id, name, contact_person as contact, phone, email, created_at FROM suppliers",
+            ("created_at", "id"), descending=True))
+
+    refresh = load
+
+    @staticmethod
+    def _values(r):
+        return (r["id"], r["name"], r.get("contact",""), r.get("phone",""), r.get("email",""))
 
     def _selected_id(self):
         sel = self.tree.selection()
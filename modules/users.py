@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from utils import fetch_all, execute_query
+from utils import fetch_all, execute_query, KeysetPager
+from widgets import VirtualTreeview, run_export
 
 class UsersWindow:
     def __init__(self, root, app):
@@ -15,18 +16,21 @@ class UsersWindow:
         ttk.Button(bar, text="Edit", command=self.edit).pack(side=tk.LEFT, padx=4)
         ttk.Button(bar, text="Delete", command=self.delete).pack(side=tk.LEFT, padx=4)
         ttk.Button(bar, text="Refresh", command=self.load).pack(side=tk.LEFT, padx=4)
+        ttk.Button(bar, text="Export", command=lambda: run_export(self.root, "users")).pack(side=tk.LEFT, padx=4)
 
-        self.tree = ttk.Treeview(t, columns=("id","username","role","created_at"), show="headings", height=16)
+        self.vlist = VirtualTreeview(t, ("id","username","role","created_at"),
+                                     lambda r: (r["id"], r["username"], r["role"], r["created_at"]), height=16)
+        self.tree = self.vlist.tree
         for c,w in (("id",60),("username",160),("role",120),("created_at",180)):
             self.tree.heading(c, text=c.capitalize()); self.tree.column(c, width=w, stretch=True)
-        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.vlist.pack(fill=tk.BOTH, expand=True)
         self.load()
 
     def load(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        rows = fetch_all("SELECT id, username, role, created_at FROM users ORDER BY created_at DESC")
-        for r in rows:
-            self.tree.insert("", tk.END, values=(r["id"], r["username"], r["role"], r["created_at"]))
+        self.vlist.set_pager(KeysetPager("SELECT id, username, role, created_at FROM users",
+                                         ("created_at", "id"), descending=True))
+
+    refresh = load
 
     def _sel(self):
         s = self.tree.selection()
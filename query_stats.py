@@ -0,0 +1,157 @@
+import atexit
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Optional, Sequence
+
+# Off by default: set PHMS_QUERY_STATS=<file.json> (or call enable()) to collect and dump on exit.
+ENABLED = False
+SLOW_QUERY_MS = float(os.environ.get("PHMS_SLOW_QUERY_MS", "100"))
+EXPLAIN_SLOW = os.environ.get("PHMS_EXPLAIN_SLOW", "") == "1"
+
+_SAMPLES_PER_STATEMENT = 1024  # recent durations kept for the p95
+_SLOW_LOG_SIZE = 200
+
+_lock = threading.Lock()
+_statements = {}   # normalized sql -> {"count", "total_ms", "rows", "samples"}
+_sources = {}      # "module:Class.method" -> {"count", "total_ms"}
+_traced = {}       # statements sqlite actually ran (incl. BEGIN/COMMIT/PRAGMA/triggers), by verb -> count
+_slow = deque(maxlen=_SLOW_LOG_SIZE)
+_context = threading.local()
+_dump_path = None
+
+_WS = re.compile(r"\s+")
+
+
+def enable(dump_path: Optional[str] = None, slow_ms: Optional[float] = None, explain: Optional[bool] = None):
+    """Start collecting; connections opened from now on get a trace callback."""
+    global ENABLED, SLOW_QUERY_MS, EXPLAIN_SLOW, _dump_path
+    ENABLED = True
+    if slow_ms is not None:
+        SLOW_QUERY_MS = slow_ms
+    if explain is not None:
+        EXPLAIN_SLOW = explain
+    if dump_path and _dump_path is None:
+        atexit.register(lambda: dump(_dump_path))
+    if dump_path:
+        _dump_path = dump_path
+
+
+def reset():
+    with _lock:
+        _statements.clear()
+        _sources.clear()
+        _traced.clear()
+        _slow.clear()
+
+
+def normalize(sql: str) -> str:
+    return _WS.sub(" ", sql).strip()
+
+
+# ---------- hooks called by db_config / utils / db_worker ----------
+
+def trace(statement: str):
+    """
+    sqlite3 trace callback: counts every statement the engine executes. Only the leading
+    verb is kept; the traced text has parameters expanded, so it is neither bounded nor safe to log.
+    """
+    stripped = statement.lstrip()
+    key = "TRIGGER" if stripped.startswith("--") else stripped.split(None, 1)[0].upper() if stripped else "?"
+    with _lock:
+        _traced[key] = _traced.get(key, 0) + 1
+
+
+def set_source(label: Optional[str]):
+    """Attribute queries on this thread to `label` (used by background workers)."""
+    _context.source = label
+
+
+def caller_source() -> str:
+    """The innermost window method (modules/*) on the current stack, for attributing load."""
+    label = getattr(_context, "source", None)
+    if label:
+        return label
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if os.path.basename(os.path.dirname(path)) == "modules":
+            module = os.path.splitext(os.path.basename(path))[0]
+            code = frame.f_code
+            # co_qualname (Class.method) is Python 3.11+; older interpreters get the bare name
+            return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return "-"
+
+
+def record(sql: str, seconds: float, rows: int, conn=None, params: Optional[Sequence[Any]] = None):
+    key = normalize(sql)
+    ms = seconds * 1000.0
+    source = caller_source()
+    with _lock:
+        st = _statements.get(key)
+        if st is None:
+            st = _statements[key] = {"count": 0, "total_ms": 0.0, "rows": 0,
+                                     "samples": deque(maxlen=_SAMPLES_PER_STATEMENT)}
+        st["count"] += 1
+        st["total_ms"] += ms
+        st["rows"] += max(rows, 0)
+        st["samples"].append(ms)
+        src = _sources.setdefault(source, {"count": 0, "total_ms": 0.0})
+        src["count"] += 1
+        src["total_ms"] += ms
+    if ms < SLOW_QUERY_MS:
+        return
+    entry = {"sql": key, "ms": round(ms, 3), "rows": rows, "source": source,
+             "at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    if EXPLAIN_SLOW and conn is not None:
+        try:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params or ()).fetchall()
+            entry["plan"] = [row[-1] for row in plan]
+        except sqlite3.Error:
+            pass
+    with _lock:
+        _slow.append(entry)
+
+
+# ---------- reporting ----------
+
+def _p95(samples) -> float:
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)] if ordered else 0.0
+
+
+def snapshot() -> dict:
+    with _lock:
+        statements = [
+            {"sql": sql, "count": st["count"], "total_ms": round(st["total_ms"], 3),
+             "avg_ms": round(st["total_ms"] / st["count"], 3), "p95_ms": round(_p95(st["samples"]), 3),
+             "rows": st["rows"]}
+            for sql, st in _statements.items()
+        ]
+        sources = [{"source": s, "count": v["count"], "total_ms": round(v["total_ms"], 3)}
+                   for s, v in _sources.items()]
+        traced = dict(_traced)
+        slow = list(_slow)
+    statements.sort(key=lambda s: s["total_ms"], reverse=True)
+    sources.sort(key=lambda s: s["total_ms"], reverse=True)
+    return {"slow_query_ms": SLOW_QUERY_MS, "statements": statements, "sources": sources,
+            "slow_queries": slow, "traced_statements": traced}
+
+
+def dump(path: Optional[str] = None):
+    path = path or _dump_path
+    if not path:
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2)
+
+
+if os.environ.get("PHMS_QUERY_STATS"):
+    enable(os.environ["PHMS_QUERY_STATS"])
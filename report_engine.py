@@ -0,0 +1,333 @@
+"""Text reports for ReportsWindow, each computed with a handful of set-based queries.
+
+Every report takes an inclusive date range as 'YYYY-MM-DD' strings and returns the rendered
+report as plain text for a fixed-width display. Sales figures come from the daily rollup
+tables (see db_config.rebuild_rollups), so their cost grows with the days in the range rather
+than the line items. Call build_report() from a DB worker.
+All of a report's queries run in one read transaction on a single read-only-report
+connection, so every section comes from the same WAL snapshot, and reporting never takes
+the write lock from the counter. Superseding the worker task interrupts it.
+"""
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import db_config
+from db_worker import executor
+from utils import Record, format_currency, iter_query, rebuild_rollups
+
+TOP_N = 20
+
+
+def _range_params(start: str, end: str) -> tuple:
+    """
+    Validated (start, end). Rollup days compare with BETWEEN; bill_date is 'YYYY-MM-DD HH:MM:SS',
+    so raw bill queries select [start, end + 1 day) to include the end day.
+    """
+    for value in (start, end):
+        datetime.strptime(value, "%Y-%m-%d")
+    if start > end:
+        raise ValueError("Start date is after end date.")
+    return start, end
+
+
+_report = threading.local()  # .conn: the snapshot connection of the report being built
+
+
+@contextmanager
+def _snapshot():
+    """One read-only-report connection holding a read transaction, for every query of a report."""
+    conn = db_config.get_connection(profile="read-only-report")
+    try:
+        # Registered with the running task, so a superseding report interrupts this one
+        with executor.interruptible(conn):
+            conn.execute("BEGIN")
+            _report.conn = conn
+            try:
+                yield conn
+            finally:
+                _report.conn = None
+                conn.rollback()
+    finally:
+        conn.close()
+
+
+def fetch_all(query: str, params: Sequence = ()) -> List[Record]:
+    conn = getattr(_report, "conn", None)
+    if conn is not None:
+        return list(iter_query(query, params, conn=conn))
+    with _snapshot() as conn:
+        return list(iter_query(query, params, conn=conn))
+
+
+def fetch_one(query: str, params: Sequence = ()) -> Optional[Record]:
+    rows = fetch_all(query, params)
+    return rows[0] if rows else None
+
+
+# ---------- rendering ----------
+
+def _table(headers: Sequence[str], rows: Sequence[Sequence], right: Sequence[int] = ()) -> str:
+    """Fixed-width table; column indexes in `right` are right-aligned."""
+    cells = [[str(c) for c in headers]] + [["" if v is None else str(v) for v in row] for row in rows]
+    widths = [max(len(r[i]) for r in cells) for i in range(len(headers))]
+    lines = []
+    for n, row in enumerate(cells):
+        lines.append("  ".join(v.rjust(w) if i in right else v.ljust(w) for i, (v, w) in enumerate(zip(row, widths))))
+        if n == 0:
+            lines.append("  ".join("-" * w for w in widths))
+    return "\n".join(line.rstrip() for line in lines)
+
+
+def _header(title: str, start: str, end: str, period_label: str = "Period") -> str:
+    return f"{title.upper()}\n{'=' * len(title)}\n\n{period_label}: {start} to {end}\n"
+
+
+def _pct(part: float, whole: float) -> str:
+    return f"{(part or 0) / whole * 100:.1f}%" if whole else "-"
+
+
+def _section(title: str, body: str) -> str:
+    return f"\n{title}\n{body}\n"
+
+
+# ---------- reports ----------
+
+def sales_report(start: str, end: str) -> str:
+    params = _range_params(start, end)
+    daily = fetch_all("""
+        SELECT day, sales, bills, paid, SUM(sales) OVER (ORDER BY day) AS running
+        FROM sales_daily
+        WHERE day BETWEEN ?1 AND ?2
+        ORDER BY day
+    """, params)
+    categories, top_items = _item_sales(start, end, 5)
+    methods = fetch_all("""
+        SELECT method, SUM(payments) AS payments, SUM(amount) AS amount
+        FROM payments_daily_method
+        WHERE day BETWEEN ?1 AND ?2
+        GROUP BY method
+        ORDER BY amount DESC
+    """, params)
+
+    total = daily[-1]["running"] if daily else 0
+    bills = sum(r["bills"] for r in daily)
+    paid = sum(r["paid"] for r in daily)
+    out = [_header("Sales Report", start, end)]
+    out.append(_section("Summary:", "\n".join([
+        f"- Total Sales: {format_currency(total)}",
+        f"- Number of Transactions: {bills:,}",
+        f"- Average Transaction Value: {format_currency(total / bills if bills else 0)}",
+        f"- Collected: {format_currency(paid)}  (outstanding {format_currency(total - paid)})",
+    ])))
+    out.append(_section("Daily Sales Breakdown:", _table(
+        ("Date", "Sales", "Transactions", "Running Total"),
+        [(r["day"], format_currency(r["sales"]), f"{r['bills']:,}", format_currency(r["running"])) for r in daily],
+        right=(1, 2, 3))))
+    cat_total = sum(r["revenue"] for r in categories)
+    out.append(_section("Category Performance:", _table(
+        ("Category", "Units", "Sales", "% of Total"),
+        [(r["label"], f"{r['units']:,}", format_currency(r["revenue"]), _pct(r["revenue"], cat_total))
+         for r in categories],
+        right=(1, 2, 3))))
+    out.append(_section("Payments by Method:", _table(
+        ("Method", "Payments", "Amount"),
+        [(r["method"], f"{r['payments']:,}", format_currency(r["amount"])) for r in methods],
+        right=(1, 2))))
+    out.append(_section("Top Selling Items:", _top_items_table(top_items)))
+    return "".join(out)
+
+
+def inventory_report(start: str, end: str) -> str:
+    categories = fetch_all("""
+        SELECT p.category, COUNT(*) AS products, SUM(i.current_stock) AS units,
+               SUM(i.current_stock * p.product_price) AS cost_value,
+               SUM(i.current_stock * p.product_mrp) AS mrp_value,
+               SUM(i.current_stock < i.minimum_stock) AS low,
+               SUM(i.current_stock = 0) AS out_of_stock
+        FROM inventory i JOIN products p ON p.id = i.product_id
+        GROUP BY p.category
+        ORDER BY mrp_value DESC
+    """)
+    low = fetch_all("""
+        SELECT p.id, p.name, i.current_stock, i.minimum_stock, i.reorder_level,
+               RANK() OVER (ORDER BY i.minimum_stock - i.current_stock DESC) AS urgency
+        FROM inventory i JOIN products p ON p.id = i.product_id
+        WHERE i.current_stock < i.minimum_stock
+        ORDER BY urgency, p.id
+        LIMIT ?
+    """, (TOP_N * 5,))
+
+    out = [_header("Inventory Report", date.today().isoformat(), date.today().isoformat(), "Stock as of")]
+    out.append(_section("Stock by Category:", _table(
+        ("Category", "Products", "Units", "Cost Value", "MRP Value", "Low", "Out"),
+        [(r["category"], f"{r['products']:,}", f"{r['units']:,}", format_currency(r["cost_value"]),
+          format_currency(r["mrp_value"]), f"{r['low']:,}", f"{r['out_of_stock']:,}") for r in categories],
+        right=(1, 2, 3, 4, 5, 6))))
+    out.append(_section(f"Below Minimum Stock (most urgent {len(low)}):", _table(
+        ("#", "ID", "Name", "Stock", "Minimum", "Reorder Level"),
+        [(r["urgency"], r["id"], r["name"], r["current_stock"], r["minimum_stock"], r["reorder_level"]) for r in low],
+        right=(0, 3, 4, 5))))
+    return "".join(out)
+
+
+def expiry_report(start: str, end: str) -> str:
+    params = _range_params(start, end)
+    months = fetch_all("""
+        SELECT month, products, units, value, SUM(value) OVER (ORDER BY month) AS cumulative
+        FROM (
+            SELECT substr(p.product_expiry, 1, 7) AS month, COUNT(*) AS products,
+                   SUM(i.current_stock) AS units, SUM(i.current_stock * p.product_price) AS value
+            FROM products p JOIN inventory i ON i.product_id = p.id
+            WHERE p.product_expiry BETWEEN ?1 AND ?2 AND i.current_stock > 0
+            GROUP BY month
+        )
+        ORDER BY month
+    """, params)
+    items = fetch_all("""
+        SELECT p.id, p.name, p.batch_number, p.product_expiry, i.current_stock,
+               i.current_stock * p.product_price AS value,
+               CAST(julianday(p.product_expiry) - julianday('now', 'localtime') AS INTEGER) AS days_left
+        FROM products p JOIN inventory i ON i.product_id = p.id
+        WHERE p.product_expiry BETWEEN ?1 AND ?2 AND i.current_stock > 0
+        ORDER BY p.product_expiry, value DESC
+        LIMIT ?3
+    """, params + (TOP_N * 5,))
+
+    out = [_header("Expiry Report", start, end, "Expiring between")]
+    out.append(_section("Stock at Risk by Month:", _table(
+        ("Month", "Products", "Units", "Cost Value", "Cumulative"),
+        [(r["month"], f"{r['products']:,}", f"{r['units']:,}", format_currency(r["value"]),
+          format_currency(r["cumulative"])) for r in months],
+        right=(1, 2, 3, 4))))
+    out.append(_section(f"Earliest Expiring (first {len(items)}):", _table(
+        ("ID", "Name", "Batch", "Expiry", "Days Left", "Stock", "Cost Value"),
+        [(r["id"], r["name"], r["batch_number"], r["product_expiry"], r["days_left"], r["current_stock"],
+          format_currency(r["value"])) for r in items],
+        right=(4, 5, 6))))
+    return "".join(out)
+
+
+def customer_sales_report(start: str, end: str) -> str:
+    params = _range_params(start, end)
+    rows = fetch_all("""
+        SELECT s.customer_id, COALESCE(c.name, 'Walk-in') AS name, s.bills, s.sales, s.due, s.last_bill,
+               DENSE_RANK() OVER (ORDER BY s.sales DESC) AS rank,
+               s.sales / SUM(s.sales) OVER () AS share
+        FROM (
+            SELECT customer_id, COUNT(*) AS bills, SUM(total_amount) AS sales,
+                   SUM(total_amount - paid_amount) AS due, MAX(bill_date) AS last_bill
+            FROM bills
+            WHERE bill_date >= ?1 AND bill_date < date(?2, '+1 day')
+            GROUP BY customer_id
+        ) s
+        LEFT JOIN customers c ON c.id = s.customer_id
+        ORDER BY rank, name
+        LIMIT ?3
+    """, params + (TOP_N * 5,))
+    totals = fetch_one("""
+        SELECT COUNT(DISTINCT customer_id) AS customers, COUNT(*) AS bills
+        FROM bills
+        WHERE bill_date >= ?1 AND bill_date < date(?2, '+1 day')
+    """, params)
+
+    out = [_header("Customer Sales", start, end)]
+    out.append(_section("Summary:", f"- Customers: {totals['customers']:,}\n- Bills: {totals['bills']:,}"))
+    out.append(_section(f"Top Customers (first {len(rows)}):", _table(
+        ("#", "Customer", "Bills", "Sales", "Share", "Outstanding", "Last Bill"),
+        [(r["rank"], r["name"], f"{r['bills']:,}", format_currency(r["sales"]), f"{(r['share'] or 0) * 100:.1f}%",
+          format_currency(r["due"]), (r["last_bill"] or "")[:10]) for r in rows],
+        right=(0, 2, 3, 4, 5))))
+    return "".join(out)
+
+
+def _item_sales(start: str, end: str, top: int):
+    """Per-category totals and the `top` items by units sold over the range."""
+    params = _range_params(start, end)
+    categories = fetch_all("""
+        SELECT category AS label, SUM(units) AS units, SUM(revenue) AS revenue
+        FROM sales_daily_category
+        WHERE day BETWEEN ?1 AND ?2
+        GROUP BY category
+        ORDER BY revenue DESC
+    """, params)
+    items = fetch_all("""
+        SELECT t.product_id AS medicine_id, COALESCE(p.name, t.product_id) AS label, p.category,
+               t.units, t.revenue,
+               RANK() OVER (ORDER BY t.units DESC) AS rank,
+               t.revenue / SUM(t.revenue) OVER () AS share
+        FROM (
+            SELECT product_id, SUM(units) AS units, SUM(revenue) AS revenue
+            FROM sales_daily_product
+            WHERE day BETWEEN ?1 AND ?2
+            GROUP BY product_id
+        ) t
+        LEFT JOIN products p ON p.id = t.product_id
+        ORDER BY rank, label
+        LIMIT ?3
+    """, params + (top,))
+    return categories, items
+
+
+def _top_items_table(items) -> str:
+    return _table(
+        ("#", "Item", "Category", "Units Sold", "Revenue", "Share"),
+        [(r["rank"], f"{r['label']} ({r['medicine_id']})", r["category"], f"{r['units']:,}",
+          format_currency(r["revenue"]), f"{(r['share'] or 0) * 100:.1f}%") for r in items],
+        right=(0, 3, 4, 5))
+
+
+def top_selling_report(start: str, end: str) -> str:
+    categories, items = _item_sales(start, end, TOP_N)
+    return (_header("Top Selling Items", start, end)
+            + _section(f"By Units Sold (top {TOP_N}):", _top_items_table(items))
+            + _section("Units by Category:", _table(
+                ("Category", "Units Sold", "Revenue"),
+                [(r["label"], f"{r['units']:,}", format_currency(r["revenue"])) for r in categories],
+                right=(1, 2))))
+
+
+REPORTS: Dict[str, Callable[[str, str], str]] = {
+    "Sales Report": sales_report,
+    "Inventory Report": inventory_report,
+    "Expiry Report": expiry_report,
+    "Customer Sales": customer_sales_report,
+    "Top Selling Items": top_selling_report,
+}
+
+
+def build_report(name: str, start: str, end: str) -> str:
+    if name not in REPORTS:
+        raise ValueError(f"Unknown report {name!r}")
+    with _snapshot():
+        return REPORTS[name](start.strip(), end.strip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a report, or regenerate the daily rollup tables.")
+    parser.add_argument("report", nargs="?", choices=sorted(REPORTS), help="report to print")
+    parser.add_argument("--start", default=date.today().replace(day=1).isoformat())
+    parser.add_argument("--end", default=date.today().isoformat())
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="regenerate the rollup tables from bills and payments first")
+    parser.add_argument("--db", help="database file (default: db_config.DB_FILE)")
+    args = parser.parse_args()
+    if not (args.report or args.rebuild_rollups):
+        parser.error("give a report name and/or --rebuild-rollups")
+
+    if args.db:
+        db_config.DB_FILE = args.db
+    if args.rebuild_rollups:
+        started = time.perf_counter()
+        counts = rebuild_rollups()
+        print(f"Rebuilt rollups in {time.perf_counter() - started:.2f}s: "
+              + ", ".join(f"{table} {n:,}" for table, n in counts.items()))
+    if args.report:
+        print(build_report(args.report, args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
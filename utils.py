@@ -1,57 +1,407 @@
-from db_config import get_connection
-from typing import Iterable, Optional, Sequence, Any, Dict, Union, List
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+import query_stats
+from cache import LRUCache
+from db_config import ROLLUP_TABLES, get_connection, get_thread_connection, rebuild_rollups as _rebuild_rollups
+from typing import Iterable, Iterator, Optional, Sequence, Any, Union, List
+
+_tx_state = threading.local()
+
+
+class Record(tuple):
+    """
+    A result row: a plain tuple that can also be read like a read-only dict
+    (row["name"], row.get("phone", ""), row.keys(), dict(row)).
+    Column names are resolved once per result set, not once per row.
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if key.__class__ is str:
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def get(self, key, default=None):
+        idx = self._index.get(key)
+        return default if idx is None else tuple.__getitem__(self, idx)
+
+    def keys(self):
+        return self._fields
+
+    def values(self):
+        return tuple(self)
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def __repr__(self):
+        return f"Record({dict(self.items())!r})"
+
+
+@lru_cache(maxsize=256)
+def _record_type(fields: tuple) -> type:
+    return type("Record", (Record,), {
+        "__slots__": (),
+        "_fields": fields,
+        "_index": {name: idx for idx, name in enumerate(fields)},
+    })
+
+
+def _to_records(cursor, rows: list) -> list:
+    if not rows:
+        return rows
+    cls = _record_type(tuple(col[0] for col in cursor.description))
+    return list(map(cls, rows))
+
+
+def _in_transaction() -> bool:
+    return getattr(_tx_state, "depth", 0) > 0
+
+
+# ---------- Table versions ----------
+# A per-table write counter, so caches of small tables can tell when they are stale.
+
+_table_versions = {}
+_versions_lock = threading.Lock()
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def _written_table(query: str) -> Optional[str]:
+    m = _WRITE_TARGET.match(query)
+    return m.group(1).lower() if m else None
+
+
+def table_version(table: str) -> int:
+    with _versions_lock:
+        return _table_versions.get(table, 0)
+
+
+def touch_tables(*tables: str):
+    """
+    Mark tables as written. Inside a transaction() the bump waits for the block to end,
+    so a reader can't cache pre-commit data under the new version.
+    execute_query does this itself; call it after writing through a raw connection.
+    """
+    if _in_transaction():
+        _tx_state.touched.update(tables)
+        return
+    with _versions_lock:
+        for table in tables:
+            _table_versions[table] = _table_versions.get(table, 0) + 1
+
+
+def invalidate_after_commit(cache, key):
+    """
+    cache.invalidate(key), held like touch_tables until the outermost transaction() ends,
+    so a caller nesting this write in a bigger transaction can't have it reloaded pre-commit.
+    """
+    if _in_transaction():
+        _tx_state.invalidated.append((cache, key))
+    else:
+        cache.invalidate(key)
+
+
+class _TimedConnection:
+    """
+    What transaction() yields while query_stats is on: the thread's connection, with every
+    execute/executemany recorded like an execute_query call (the write paths use these directly).
+    """
+    __slots__ = ("_conn",)
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql: str, params: Sequence[Any] = ()):
+        started = time.perf_counter()
+        cur = self._conn.execute(sql, params)
+        query_stats.record(sql, time.perf_counter() - started, cur.rowcount, self._conn, params)
+        return cur
+
+    def executemany(self, sql: str, seq_of_params):
+        started = time.perf_counter()
+        cur = self._conn.executemany(sql, seq_of_params)
+        query_stats.record(sql, time.perf_counter() - started, cur.rowcount, self._conn)
+        return cur
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+@contextmanager
+def transaction():
+    """
+    Run everything inside the block as one atomic unit on this thread's connection.
+    execute_query calls made inside the block join it instead of committing on their own;
+    nested blocks join the outermost one.
+    """
+    conn = get_thread_connection()
+    depth = getattr(_tx_state, "depth", 0)
+    if depth == 0:
+        _tx_state.touched = set()
+        _tx_state.invalidated = []
+    _tx_state.depth = depth + 1
+    try:
+        if depth == 0:
+            # Take the write lock up front so two counters can't deadlock upgrading a read lock
+            conn.execute("BEGIN IMMEDIATE")
+        yield _TimedConnection(conn) if query_stats.ENABLED else conn
+        if depth == 0:
+            conn.commit()
+    except BaseException:
+        if depth == 0:
+            conn.rollback()
+        raise
+    finally:
+        _tx_state.depth = depth
+        if depth == 0 and _tx_state.touched:
+            touch_tables(*_tx_state.touched)
+        if depth == 0:
+            for cache, key in _tx_state.invalidated:
+                cache.invalidate(key)
 
 
 def execute_query(
     query: str,
     params: Optional[Sequence[Any]] = None,
     fetch: bool = False,
-    many: bool = False
-) -> Union[List[Dict], int, None]:
+    many: bool = False,
+    raw: bool = False
+) -> Union[List[Record], List[tuple], int, None]:
     """
     Execute a query and return:
-      - list of dicts if fetch=True
+      - list of Records (dict-style access by column name) if fetch=True
+      - list of plain tuples if fetch=True and raw=True (bulk paths, e.g. CSV export)
       - lastrowid if INSERT/UPDATE/DELETE
       - None if nothing
     """
-    conn = get_connection()
-    # Set row factory so we can easily convert to dict
-    conn.row_factory = lambda cursor, row: {
-        col[0]: row[idx] for idx, col in enumerate(cursor.description)
-    }
+    conn = get_thread_connection()
     cur = conn.cursor()
+    # Plain tuples from sqlite; column names are attached once per result set below
+    cur.row_factory = None
 
     if params is None:
         params = ()
 
-    if many:
-        cur.executemany(query, params)
-    else:
-        cur.execute(query, params)
-
-    rows = cur.fetchall() if fetch else None
-    last_id = cur.lastrowid
-
-    conn.commit()
-    conn.close()
+    try:
+        started = time.perf_counter()
+        if many:
+            cur.executemany(query, params)
+        else:
+            cur.execute(query, params)
+
+        rows = cur.fetchall() if fetch else None
+        if query_stats.ENABLED:
+            query_stats.record(query, time.perf_counter() - started,
+                               len(rows) if rows is not None else cur.rowcount,
+                               conn, None if many else params)
+        if rows and not raw:
+            rows = _to_records(cur, rows)
+        last_id = cur.lastrowid
+        if not _in_transaction():
+            conn.commit()
+        table = _written_table(query)
+        if table is not None:
+            touch_tables(table)
+    except Exception:
+        # The connection outlives this call, so never leave a transaction open on it
+        if not _in_transaction():
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
 
     if fetch:
         return rows
     return last_id
 
 
-def fetch_one(query: str, params: Optional[Sequence[Any]] = None) -> Optional[Dict]:
+def fetch_one(query: str, params: Optional[Sequence[Any]] = None) -> Optional[Record]:
     rows = execute_query(query, params=params, fetch=True)
     if rows and len(rows) > 0:
         return rows[0]
     return None
 
 
-def fetch_all(query: str, params: Optional[Sequence[Any]] = None) -> List[Dict]:
-    rows = execute_query(query, params=params, fetch=True)
+def fetch_all(query: str, params: Optional[Sequence[Any]] = None, raw: bool = False) -> List[Record]:
+    rows = execute_query(query, params=params, fetch=True, raw=raw)
     return rows if rows else []
 
 
+def iter_query(
+    query: str,
+    params: Optional[Sequence[Any]] = None,
+    batch_size: int = 1000,
+    raw: bool = False,
+    conn=None
+) -> Iterator[Union[Record, tuple]]:
+    """
+    Stream a SELECT lazily, `batch_size` rows at a time, so memory stays flat however
+    large the result is. Runs on its own read-only connection (a consistent snapshot
+    under WAL), which is closed when the generator is exhausted or closed; pass `conn`
+    to run on a connection the caller opened (and closes) instead.
+    """
+    own = conn is None
+    if own:
+        conn = get_connection(profile="read-only-report")
+    started, count = time.perf_counter(), 0
+    try:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(query, params or ())
+        cls = None if raw else _record_type(tuple(col[0] for col in cur.description))
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            count += len(rows)
+            if cls is None:
+                yield from rows
+            else:
+                yield from map(cls, rows)
+    finally:
+        # Time includes the consumer's work between batches: it is how long the stream stayed open
+        if query_stats.ENABLED:
+            query_stats.record(query, time.perf_counter() - started, count, conn, params)
+        if own:
+            conn.close()
+
+
+def fetch_page(
+    query: str,
+    key_columns: Sequence[str],
+    params: Optional[Sequence[Any]] = None,
+    after: Optional[Sequence[Any]] = None,
+    before: Optional[Sequence[Any]] = None,
+    limit: int = 200,
+    descending: bool = False
+) -> List[Record]:
+    """
+    Keyset pagination: one page of `query` (a SELECT without ORDER BY / LIMIT) ordered by
+    `key_columns`, which must be unique together (end them with the primary key) and be
+    output columns of the query. Pass the key values of the last row shown as `after` for
+    the next page, or of the first row as `before` for the previous one. Pages cost the same
+    however deep you scroll, unlike OFFSET, when an index covers the key columns.
+    """
+    forward = before is None
+    # Walking backwards flips both the comparison and the sort, then the page is reversed
+    ascending = forward != descending
+    cursor_key = after if forward else before
+    cols = ", ".join(key_columns)
+    sql = f"SELECT * FROM ({query}) AS page"
+    args = list(params or ())
+    if cursor_key is not None:
+        marks = ", ".join("?" * len(key_columns))
+        sql += f" WHERE ({cols}) {'>' if ascending else '<'} ({marks})"
+        args.extend(cursor_key)
+    direction = "ASC" if ascending else "DESC"
+    sql += " ORDER BY " + ", ".join(f"{c} {direction}" for c in key_columns) + " LIMIT ?"
+    args.append(limit)
+    rows = fetch_all(sql, args)
+    if not forward:
+        rows.reverse()
+    return rows
+
+
+class KeysetPager:
+    """A query plus its keyset ordering; hands out pages relative to rows already shown."""
+
+    def __init__(self, query: str, key_columns: Sequence[str], params: Optional[Sequence[Any]] = None,
+                 descending: bool = False, page_size: int = 200):
+        self.query = query
+        self.key_columns = tuple(key_columns)
+        self.params = tuple(params or ())
+        self.descending = descending
+        self.page_size = page_size
+
+    def key_of(self, row) -> tuple:
+        return tuple(row[c] for c in self.key_columns)
+
+    def first(self) -> List[Record]:
+        return fetch_page(self.query, self.key_columns, self.params,
+                          limit=self.page_size, descending=self.descending)
+
+    def after(self, row) -> List[Record]:
+        return fetch_page(self.query, self.key_columns, self.params, after=self.key_of(row),
+                          limit=self.page_size, descending=self.descending)
+
+    def before(self, row) -> List[Record]:
+        return fetch_page(self.query, self.key_columns, self.params, before=self.key_of(row),
+                          limit=self.page_size, descending=self.descending)
+
+
+# ---------- Reference data ----------
+# Short, mostly-static lists behind comboboxes, loaded whole. Each is kept until one of the
+# tables it reads is written here (see touch_tables) or, for other terminals' writes,
+# until it is REFERENCE_TTL seconds old. Customers are too many to list; see suggest_customers.
+
+REFERENCE_TTL = 60.0
+
+REFERENCE_QUERIES = {
+    "suppliers": (("suppliers",), "SELECT id, name FROM suppliers ORDER BY name"),
+    "doctors": (("doctors",), "SELECT id, name, specialization FROM doctors ORDER BY name"),
+}
+
+_reference_cache = {}  # name -> (loaded_at, versions of its tables when loaded, rows)
+_reference_lock = threading.Lock()
+
+
+def get_reference(name: str, max_age: float = REFERENCE_TTL) -> List[Record]:
+    """One of REFERENCE_QUERIES' lists (shared; don't modify), from memory unless it changed or expired."""
+    tables, query = REFERENCE_QUERIES[name]
+    versions = tuple(table_version(t) for t in tables)
+    with _reference_lock:
+        cached = _reference_cache.get(name)
+    if cached is not None and cached[1] == versions and time.monotonic() - cached[0] < max_age:
+        return cached[2]
+    rows = fetch_all(query)
+    with _reference_lock:
+        # A write that landed while loading leaves the versions newer; let the next caller reload
+        if versions == tuple(table_version(t) for t in tables):
+            _reference_cache[name] = (time.monotonic(), versions, rows)
+    return rows
+
+
+# ---------- Dashboard ----------
+# MainWindow's KPIs. Other terminals' writes can't bump this process's table versions, so
+# the cached figures also expire after DASHBOARD_TTL seconds.
+
+DASHBOARD_TTL = 15.0
+_DASHBOARD_TABLES = ("products", "inventory", "sales_daily")
+_dashboard_cache = {}  # "stats" -> (loaded_at, versions, row)
+_dashboard_lock = threading.Lock()
+
+
+def get_dashboard_stats(max_age: float = DASHBOARD_TTL) -> Record:
+    """medicines, low_stock, today_sales and total_sales, from one aggregate query over small tables."""
+    versions = tuple(table_version(t) for t in _DASHBOARD_TABLES)
+    with _dashboard_lock:
+        cached = _dashboard_cache.get("stats")
+    if cached is not None and cached[1] == versions and time.monotonic() - cached[0] < max_age:
+        return cached[2]
+    row = fetch_one("""
+        SELECT (SELECT COUNT(*) FROM products) AS medicines,
+               (SELECT COUNT(*) FROM inventory WHERE current_stock < minimum_stock) AS low_stock,
+               (SELECT COALESCE(SUM(sales), 0) FROM sales_daily WHERE day = date('now', 'localtime')) AS today_sales,
+               (SELECT COALESCE(SUM(sales), 0) FROM sales_daily) AS total_sales
+    """)
+    with _dashboard_lock:
+        if versions == tuple(table_version(t) for t in _DASHBOARD_TABLES):
+            _dashboard_cache["stats"] = (time.monotonic(), versions, row)
+    return row
+
+
 def format_currency(v: float) -> str:
     try:
         return f"₹{float(v):,.2f}"
@@ -70,99 +420,425 @@ def get_customer_bills(customer_id: int):
     """, (customer_id,))
 
 
-def get_last_bill(customer_id: int):
-    bill = fetch_one("""
-        SELECT b.id, b.bill_date, b.total_amount, b.payment_status
-        FROM bills b
-        WHERE b.customer_id = ?
-        ORDER BY b.bill_date DESC, b.id DESC
-        LIMIT 1
+# Last bill per customer; CustomersWindow asks for it on every selection change.
+# create_bill / record_payment invalidate the affected customer's entry; bills and payments
+# other terminals record show up once the entry is LAST_BILL_TTL seconds old.
+LAST_BILL_TTL = 15.0
+_last_bill_cache = LRUCache(maxsize=256, max_age=LAST_BILL_TTL)
+
+
+def _load_last_bill(customer_id: int) -> Optional[dict]:
+    # Header and items in one round trip: the newest bill (via idx_bills_customer) joined to its lines
+    rows = fetch_all("""
+        SELECT b.id, b.bill_date, b.total_amount, b.payment_status,
+               bi.quantity, bi.price, m.name AS medicine_name, bi.medicine_id
+        FROM (
+            SELECT id, bill_date, total_amount, payment_status
+            FROM bills
+            WHERE customer_id = ?
+            ORDER BY bill_date DESC, id DESC
+            LIMIT 1
+        ) b
+        LEFT JOIN bill_items bi ON bi.bill_id = b.id
+        LEFT JOIN products m ON m.id = bi.medicine_id
+        ORDER BY bi.id
     """, (customer_id,))
-    if not bill:
+    if not rows:
         return None
+    first = rows[0]
+    return {
+        "id": first["id"],
+        "bill_date": first["bill_date"],
+        "total_amount": first["total_amount"],
+        "payment_status": first["payment_status"],
+        "items": [
+            {"quantity": r["quantity"], "price": r["price"],
+             "medicine_name": r["medicine_name"], "medicine_id": r["medicine_id"]}
+            for r in rows if r["medicine_id"] is not None
+        ],
+    }
 
-    items = fetch_all("""
-        SELECT bi.quantity, bi.price, m.name AS medicine_name, m.id AS medicine_id
-        FROM bill_items bi
-        JOIN medicines m ON m.id = bi.medicine_id
-        WHERE bi.bill_id = ?
-    """, (bill["id"],))
 
-    bill["items"] = items
-    return bill
+def get_last_bill(customer_id: int) -> Optional[dict]:
+    """The customer's most recent bill with its items (cached; treat the result as read-only)."""
+    return _last_bill_cache.get_or_load(customer_id, lambda: _load_last_bill(customer_id))
+
+
+def last_bill_cache_info() -> dict:
+    return _last_bill_cache.info()
+
+
+def clear_caches():
+    """Drop every in-process cache (e.g. after switching db_config.DB_FILE)."""
+    _last_bill_cache.clear()
+    with _reference_lock:
+        _reference_cache.clear()
+    with _dashboard_lock:
+        _dashboard_cache.clear()
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, medicine_id: str, requested: int, available: Optional[int]):
+        self.medicine_id = medicine_id
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Insufficient stock for {medicine_id}: requested {requested}, available {available or 0}")
+
+
+def _line_items(items: Iterable[dict]) -> List[tuple]:
+    return [(it["medicine_id"], int(it["quantity"]), float(it["price"])) for it in items]
+
+
+def _quantities_by_product(lines: List[tuple]) -> dict:
+    qty_by_product = {}
+    for mid, qty, _ in lines:
+        qty_by_product[mid] = qty_by_product.get(mid, 0) + qty
+    return qty_by_product
+
+
+def decrement_stock(conn, medicine_id: str, quantity: int) -> int:
+    """
+    Take `quantity` units off the product's stock in one conditional UPDATE, so two counters
+    can never both sell the last unit. Returns the new stock; raises InsufficientStockError.
+    Call inside transaction() so a failure rolls back the rest of the document.
+    """
+    row = conn.execute("""
+        UPDATE inventory
+        SET current_stock = current_stock - ?, last_updated = datetime('now','localtime')
+        WHERE product_id = ? AND current_stock >= ?
+        RETURNING current_stock
+    """, (quantity, medicine_id, quantity)).fetchone()
+    if row is None:
+        available = conn.execute("SELECT current_stock FROM inventory WHERE product_id = ?",
+                                 (medicine_id,)).fetchone()
+        raise InsufficientStockError(medicine_id, quantity, available[0] if available else None)
+    return row[0]
+
+
+def increment_stock_many(conn, quantities: dict):
+    """Add stock for several products at once, creating inventory rows as needed."""
+    conn.executemany("""
+        INSERT INTO inventory (product_id, current_stock) VALUES (?, ?)
+        ON CONFLICT(product_id) DO UPDATE
+        SET current_stock = current_stock + excluded.current_stock, last_updated = datetime('now','localtime')
+    """, list(quantities.items()))
+
+
+# ---------- Sequences ----------
+# Codes come from the `sequences` counters, bumped inside the transaction that inserts the
+# row: the write lock serializes terminals, and a rollback hands the number back (no gaps).
+
+# name -> (prefix, minimum digits)
+SEQUENCES = {"product": ("M", 3), "bill": ("B", 6), "purchase": ("P", 6)}
+
+
+def next_code(conn, name: str) -> str:
+    """Allocate the next code of sequence `name`; call inside the transaction() that uses it."""
+    prefix, digits = SEQUENCES[name]
+    value = conn.execute("UPDATE sequences SET value = value + 1 WHERE name = ? RETURNING value",
+                         (name,)).fetchone()[0]
+    return f"{prefix}{value:0{digits}d}"
+
+
+def peek_code(name: str) -> str:
+    """The code next_code would allocate now; only a preview, another terminal may take it first."""
+    prefix, digits = SEQUENCES[name]
+    row = fetch_one("SELECT value FROM sequences WHERE name = ?", (name,))
+    return f"{prefix}{(row['value'] if row else 0) + 1:0{digits}d}"
+
+
+def create_product(name: str, category: str, product_mrp: float, product_expiry: str) -> str:
+    """Insert a product under the next "M###" code; returns the code."""
+    with transaction() as conn:
+        product_id = next_code(conn, "product")
+        conn.execute("INSERT INTO products (id, name, category, product_mrp, product_expiry) VALUES (?, ?, ?, ?, ?)",
+                     (product_id, name, category, product_mrp, product_expiry))
+        touch_tables("products")
+    return product_id
+
+
+# ---------- Daily rollups ----------
+# The sales_daily* / payments_daily_method tables (see db_config) are updated in the same
+# transaction as the bill or payment, so reports over a date range read one row per day.
+
+def _roll_up_bill(conn, day: str, total: float, lines: List[tuple]):
+    conn.execute("""
+        INSERT INTO sales_daily (day, bills, sales) VALUES (?, 1, ?)
+        ON CONFLICT(day) DO UPDATE SET bills = bills + 1, sales = sales + excluded.sales
+    """, (day, total))
+    per_product = {}
+    for mid, qty, price in lines:
+        units, revenue = per_product.get(mid, (0, 0.0))
+        per_product[mid] = (units + qty, revenue + qty * price)
+    conn.executemany("""
+        INSERT INTO sales_daily_product (day, product_id, units, revenue) VALUES (?, ?, ?, ?)
+        ON CONFLICT(day, product_id) DO UPDATE
+        SET units = units + excluded.units, revenue = revenue + excluded.revenue
+    """, [(day, mid, units, revenue) for mid, (units, revenue) in per_product.items()])
+    # Categories as of the sale; the WHERE lets the upsert follow a SELECT
+    conn.executemany("""
+        INSERT INTO sales_daily_category (day, category, units, revenue)
+        SELECT ?, COALESCE((SELECT category FROM products WHERE id = ?), 'Unknown'), ?, ? WHERE true
+        ON CONFLICT(day, category) DO UPDATE
+        SET units = units + excluded.units, revenue = revenue + excluded.revenue
+    """, [(day, mid, units, revenue) for mid, (units, revenue) in per_product.items()])
+    touch_tables("sales_daily", "sales_daily_product", "sales_daily_category")
+
+
+def _roll_up_payment(conn, day: str, bill_day: Optional[str], method: str, amount: float):
+    conn.execute("""
+        INSERT INTO payments_daily_method (day, method, payments, amount) VALUES (?, ?, 1, ?)
+        ON CONFLICT(day, method) DO UPDATE SET payments = payments + 1, amount = amount + excluded.amount
+    """, (day, method, amount))
+    if bill_day is not None:
+        conn.execute("UPDATE sales_daily SET paid = paid + ? WHERE day = ?", (amount, bill_day))
+    touch_tables("payments_daily_method", "sales_daily")
+
+
+def rebuild_rollups() -> dict:
+    """Regenerate the daily rollup tables from raw bills and payments; returns their row counts."""
+    with transaction() as conn:
+        _rebuild_rollups(conn)
+        counts = {t: conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ROLLUP_TABLES}
+    touch_tables(*ROLLUP_TABLES)
+    return counts
 
 
 def create_bill(customer_id: Optional[int], items: Iterable[dict]) -> int:
-    total = sum(float(it["price"]) * int(it["quantity"]) for it in items)
-    bill_id = execute_query(
-        "INSERT INTO bills (customer_id, total_amount, payment_status) VALUES (?, ?, 'unpaid')",
-        (customer_id, total)
-    )
-    for it in items:
-        execute_query("""
+    lines = _line_items(items)
+    total = sum(qty * price for _, qty, price in lines)
+    with transaction() as conn:
+        bill_id, bill_date = conn.execute(
+            "INSERT INTO bills (bill_no, customer_id, total_amount, payment_status) VALUES (?, ?, ?, 'unpaid') "
+            "RETURNING id, bill_date",
+            (next_code(conn, "bill"), customer_id, total)
+        ).fetchone()
+        conn.executemany("""
             INSERT INTO bill_items (bill_id, medicine_id, quantity, price)
             VALUES (?, ?, ?, ?)
-        """, (bill_id, it["medicine_id"], int(it["quantity"]), float(it["price"])))
-        # reduce stock
-        execute_query("UPDATE medicines SET stock = stock - ? WHERE id = ?", (int(it["quantity"]), it["medicine_id"]))
+        """, [(bill_id, mid, qty, price) for mid, qty, price in lines])
+        # reduce stock; any line short of stock aborts the whole bill
+        for mid, qty in _quantities_by_product(lines).items():
+            decrement_stock(conn, mid, qty)
+        touch_tables("inventory")
+        _roll_up_bill(conn, bill_date[:10], total, lines)
+        if customer_id is not None:
+            invalidate_after_commit(_last_bill_cache, customer_id)
     return bill_id
 
 
 def create_purchase(supplier_id: int, items: Iterable[dict], notes: str = "") -> int:
-    total = sum(float(it["price"]) * int(it["quantity"]) for it in items)
-    pid = execute_query(
-        "INSERT INTO purchases (supplier_id, total_amount, notes) VALUES (?, ?, ?)",
-        (supplier_id, total, notes)
-    )
-    for it in items:
-        execute_query("""
+    lines = _line_items(items)
+    total = sum(qty * price for _, qty, price in lines)
+    with transaction() as conn:
+        pid = conn.execute(
+            "INSERT INTO purchases (purchase_no, supplier_id, total_amount, notes) VALUES (?, ?, ?, ?)",
+            (next_code(conn, "purchase"), supplier_id, total, notes)
+        ).lastrowid
+        conn.executemany("""
             INSERT INTO purchase_items (purchase_id, medicine_id, quantity, price)
             VALUES (?, ?, ?, ?)
-        """, (pid, it["medicine_id"], int(it["quantity"]), float(it["price"])))
+        """, [(pid, mid, qty, price) for mid, qty, price in lines])
         # increase stock
-        execute_query("UPDATE medicines SET stock = stock + ? WHERE id = ?", (int(it["quantity"]), it["medicine_id"]))
+        increment_stock_many(conn, _quantities_by_product(lines))
+        touch_tables("inventory")
     return pid
 
 
 def record_payment(bill_id: int, amount: float, method: str, reference: str = "") -> int:
-    pay_id = execute_query("""
-        INSERT INTO payments (bill_id, amount, method, reference) VALUES (?, ?, ?, ?)
-    """, (bill_id, float(amount), method, reference))
-
-    # Update status if fully paid
-    totals = fetch_one("""
-        SELECT
-          (SELECT COALESCE(SUM(amount),0) FROM payments WHERE bill_id = ?) AS paid,
-          (SELECT total_amount FROM bills WHERE id = ?) AS total
-    """, (bill_id, bill_id))
+    amount = float(amount)
+    with transaction() as conn:
+        pay_id, payment_date = conn.execute("""
+            INSERT INTO payments (bill_id, amount, method, reference) VALUES (?, ?, ?, ?)
+            RETURNING id, payment_date
+        """, (bill_id, amount, method, reference)).fetchone()
+
+        # Bump the running total and flip the status in the same statement (old values on the right)
+        bill = conn.execute("""
+            UPDATE bills
+            SET paid_amount = paid_amount + ?,
+                payment_status = CASE WHEN paid_amount + ? >= total_amount THEN 'paid' ELSE payment_status END
+            WHERE id = ?
+            RETURNING customer_id, bill_date
+        """, (amount, amount, bill_id)).fetchone()
+        _roll_up_payment(conn, payment_date[:10], bill[1][:10] if bill else None, method, amount)
+        if bill is not None and bill[0] is not None:
+            invalidate_after_commit(_last_bill_cache, bill[0])
+    return pay_id
 
-    if totals and float(totals["paid"]) >= float(totals["total"]):
-        execute_query("UPDATE bills SET payment_status = 'paid' WHERE id = ?", (bill_id,))
 
-    return pay_id
+def checkout(customer_id: Optional[int], items: Iterable[dict], method: str, reference: str = "") -> Record:
+    """
+    A counter sale: the bill and its payment in full, committed together. Returns the bill's
+    id, bill_no and total_amount. Raises InsufficientStockError with nothing written.
+    """
+    with transaction() as conn:
+        bill_id = create_bill(customer_id, items)
+        cur = conn.execute("SELECT id, bill_no, total_amount FROM bills WHERE id = ?", (bill_id,))
+        bill = _to_records(cur, cur.fetchall())[0]
+        record_payment(bill_id, bill["total_amount"], method, reference)
+    return bill
 
 
-def get_medicine_stock(medicine_id: str) -> Optional[int]:
-    med = fetch_one("SELECT stock FROM medicines WHERE id = ?", (medicine_id,))
-    if med:
-        return med["stock"]
+def check_paid_amounts(repair: bool = False) -> List[Record]:
+    """
+    Bills whose paid_amount disagrees with the sum of their payments, or whose payment_status
+    disagrees with paid_amount and total_amount. With repair=True both are recomputed for those bills.
+    """
+    drift = fetch_all("""
+        SELECT b.id, b.customer_id, b.paid_amount, b.payment_status, COALESCE(p.paid, 0) AS actual,
+               CASE WHEN COALESCE(p.paid, 0) >= b.total_amount AND COALESCE(p.paid, 0) > 0
+                    THEN 'paid' ELSE 'unpaid' END AS status
+        FROM bills b
+        LEFT JOIN (SELECT bill_id, SUM(amount) AS paid FROM payments GROUP BY bill_id) p ON p.bill_id = b.id
+        WHERE ABS(b.paid_amount - COALESCE(p.paid, 0)) > 0.005
+           OR b.payment_status <> CASE WHEN COALESCE(p.paid, 0) >= b.total_amount AND COALESCE(p.paid, 0) > 0
+                                       THEN 'paid' ELSE 'unpaid' END
+    """)
+    if repair and drift:
+        with transaction() as conn:
+            conn.executemany("UPDATE bills SET paid_amount = ?, payment_status = ? WHERE id = ?",
+                             [(r["actual"], r["status"], r["id"]) for r in drift])
+            _rebuild_rollups(conn)
+            touch_tables(*ROLLUP_TABLES)
+            for customer_id in {r["customer_id"] for r in drift if r["customer_id"] is not None}:
+                invalidate_after_commit(_last_bill_cache, customer_id)
+    return drift
+
+
+def validate_product(name: str, category: str, price_str: str, expiry_str: str) -> Optional[str]:
+    """The product form's rules; returns the first problem found, or None if the values are valid."""
+    if not name.strip(): return "Name is required."
+    if not category.strip(): return "Category is required."
+    try:
+        price = float(price_str)
+        if price < 0: return "Price must be ≥ 0."
+    except Exception:
+        return "Price must be a number."
+    try:
+        datetime.strptime(expiry_str, "%Y-%m-%d")
+    except Exception:
+        return "Expiry must be in YYYY-MM-DD format."
     return None
 
 
-def update_medicine_stock(medicine_id: str, new_stock: int) -> bool:
-    res = execute_query("UPDATE medicines SET stock = ? WHERE id = ?", (new_stock, medicine_id))
-    return res is not None
+def get_medicine_stock(medicine_id: str) -> Optional[int]:
+    row = fetch_one("SELECT current_stock FROM inventory WHERE product_id = ?", (medicine_id,))
+    if row:
+        return row["current_stock"]
+    return None
 
 
-def get_single_medicine(medicine_id: str) -> Optional[Dict]:
-    return fetch_one("SELECT * FROM medicines WHERE id = ?", (medicine_id,))
+def update_medicine_stock(medicine_id: str, new_stock: int, minimum_stock: Optional[int] = None) -> bool:
+    """Set the counted stock (and optionally the minimum) for a product."""
+    if int(new_stock) < 0:
+        raise ValueError("Stock cannot be negative.")
+    with transaction() as conn:
+        cur = conn.execute("""
+            UPDATE inventory
+            SET current_stock = ?, minimum_stock = COALESCE(?, minimum_stock),
+                last_updated = datetime('now','localtime')
+            WHERE product_id = ?
+        """, (int(new_stock), minimum_stock, medicine_id))
+    return cur.rowcount > 0
 
 
-def search_medicines(term: str) -> Iterable[Dict]:
-    like_term = f"%{term}%"
+def get_inventory() -> List[Record]:
+    return fetch_all("""
+        SELECT p.id, p.name, p.category, i.current_stock, i.minimum_stock, i.reorder_level
+        FROM inventory i
+        JOIN products p ON p.id = i.product_id
+        ORDER BY p.id
+    """)
+
+
+def get_single_medicine(medicine_id: str) -> Optional[Record]:
+    return fetch_one("""
+        SELECT p.*, i.current_stock AS stock, i.minimum_stock
+        FROM products p
+        LEFT JOIN inventory i ON i.product_id = p.id
+        WHERE p.id = ?
+    """, (medicine_id,))
+
+
+def _fts_query(term: str) -> Optional[str]:
+    """Turn free text into an FTS5 query (every word must match), or None if the trigram index can't serve it."""
+    words = term.split()
+    # Trigrams need at least three characters per word
+    if not words or any(len(w) < 3 for w in words):
+        return None
+    return " ".join('"' + w.replace('"', '""') + '"' for w in words)
+
+
+def _like_prefix(term: str) -> str:
+    """A LIKE pattern (with ESCAPE '\\') matching values that start with `term`."""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def search_medicines(term: str, limit: Optional[int] = 100) -> List[Record]:
+    """Products matching `term` in id, name, category, manufacturer or batch number, best matches first."""
+    term = term.strip()
+    if not term:
+        return []
+    limit = -1 if limit is None else limit
+    match = _fts_query(term)
+    if match is None:
+        # Too short for the trigram index: prefix match on the indexed id / name instead
+        prefix = _like_prefix(term)
+        return fetch_all(r"""
+            SELECT * FROM products
+            WHERE id LIKE ? ESCAPE '\' OR name LIKE ? ESCAPE '\'
+            ORDER BY name ASC
+            LIMIT ?
+        """, (prefix, prefix, limit))
     return fetch_all("""
-        SELECT * FROM medicines
-        WHERE id LIKE ? OR name LIKE ? OR manufacturer LIKE ? OR category LIKE ? OR batch_number LIKE ? OR expiry LIKE ?
-        ORDER BY name ASC
-        LIMIT 100
-    """, (like_term, like_term, like_term, like_term, like_term, like_term))
+        SELECT p.* FROM products_fts f
+        JOIN products p ON p.rowid = f.rowid
+        WHERE products_fts MATCH ?
+        ORDER BY f.rank, p.name
+        LIMIT ?
+    """, (match, limit))
+
+
+def suggest_customers(term: str, limit: int = 20) -> List[Record]:
+    """Customers whose name starts with `term` (NOCASE index) or whose phone is exactly `term`."""
+    term = term.strip()
+    if not term:
+        return []
+    return fetch_all(r"""
+        SELECT id, name, phone FROM customers
+        WHERE name LIKE ? ESCAPE '\' OR phone = ?
+        ORDER BY name
+        LIMIT ?
+    """, (_like_prefix(term), term, limit))
+
+
+def suggest_medicines(term: str, limit: int = 20) -> List[Record]:
+    """
+    Top matches for a type-ahead picker: id, name, MRP, purchase price and current stock.
+    Short input is a prefix match on the NOCASE id / name indexes; longer input goes through
+    the trigram index, with names that start with the input ranked first.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    prefix = _like_prefix(term)
+    match = _fts_query(term)
+    if match is None:
+        return fetch_all(r"""
+            SELECT p.id, p.name, p.product_mrp, p.product_price, COALESCE(i.current_stock, 0) AS stock
+            FROM products p
+            LEFT JOIN inventory i ON i.product_id = p.id
+            WHERE p.id LIKE ? ESCAPE '\' OR p.name LIKE ? ESCAPE '\'
+            ORDER BY p.name
+            LIMIT ?
+        """, (prefix, prefix, limit))
+    return fetch_all(r"""
+        SELECT p.id, p.name, p.product_mrp, p.product_price, COALESCE(i.current_stock, 0) AS stock
+        FROM products_fts f
+        JOIN products p ON p.rowid = f.rowid
+        LEFT JOIN inventory i ON i.product_id = p.id
+        WHERE products_fts MATCH ?
+        ORDER BY p.name LIKE ? ESCAPE '\' DESC, f.rank, p.name
+        LIMIT ?
+    """, (match, prefix, limit))
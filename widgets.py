@@ -0,0 +1,339 @@
+import threading
+import tkinter as tk
+from collections import deque
+from tkinter import ttk, messagebox, filedialog
+from typing import Callable, Optional, Sequence
+
+import exporter
+import importer
+from db_worker import executor, run_async
+from utils import format_currency, suggest_medicines
+
+
+class VirtualTreeview(ttk.Frame):
+    """
+    A Treeview over a keyset-paginated query (utils.KeysetPager).
+
+    Only a sliding window of `max_pages` pages is ever inserted into the Treeview. Scrolling
+    near the bottom fetches the next page on a DB worker and appends it; once the window is
+    full the page at the other end is released, and scrolling back fetches it again. Rows
+    are turned into Treeview values by `to_values(row)`.
+
+    Use `.tree` for headings, columns, bindings and selection like a plain Treeview.
+    """
+
+    EDGE = 0.1  # fraction of the scroll range that counts as "near the end"
+
+    def __init__(self, master, columns: Sequence[str], to_values: Callable, page_size: int = 200,
+                 max_pages: int = 5, **tree_options):
+        super().__init__(master)
+        self.to_values = to_values
+        self.page_size = page_size
+        self.max_pages = max(2, max_pages)
+        self.pager = None
+
+        self.tree = ttk.Treeview(self, columns=columns, show="headings", **tree_options)
+        self.vsb = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_yscroll)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.vsb.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self._pages = deque()  # (first_row, last_row, item_ids), top to bottom
+        self._more_after = False
+        self._more_before = False
+        self._loading = False
+
+    # ---------- public ----------
+
+    def set_pager(self, pager):
+        """Show a new query from its first page (e.g. after a search or a write)."""
+        self.pager = pager
+        pager.page_size = self.page_size
+        self._request(pager.first, self._show_first)
+
+    def refresh(self):
+        if self.pager is not None:
+            self.set_pager(self.pager)
+
+    def show_rows(self, rows):
+        """Show a fixed, already-fetched list (e.g. ranked search results) without paging."""
+        self._loading = False
+        self.pager = None
+        self._clear()
+        if rows:
+            self._add_page(rows, at_end=True)
+
+    def show_results(self, fn, *args):
+        """Run fn(*args) on a worker and show the rows it returns without paging."""
+        self._request(fn, self.show_rows, *args)
+
+    # ---------- paging ----------
+
+    def _request(self, fn, on_done, *args):
+        self._loading = True
+        run_async(fn, *args, key=(self, "page"), widget=self.tree, on_done=on_done, on_error=self._on_error)
+
+    def _on_error(self, exc):
+        self._loading = False
+        messagebox.showerror("DB Error", str(exc), parent=self.winfo_toplevel())
+
+    def _clear(self):
+        self.tree.delete(*self.tree.get_children())
+        self._pages.clear()
+        self._more_after = self._more_before = False
+
+    def _add_page(self, rows, at_end: bool):
+        if at_end:
+            ids = [self.tree.insert("", tk.END, values=self.to_values(r)) for r in rows]
+            self._pages.append((rows[0], rows[-1], ids))
+        else:
+            ids = [self.tree.insert("", i, values=self.to_values(r)) for i, r in enumerate(rows)]
+            self._pages.appendleft((rows[0], rows[-1], ids))
+
+    def _show_first(self, rows):
+        self._loading = False
+        self._clear()
+        if rows:
+            self._add_page(rows, at_end=True)
+        self._more_after = len(rows) >= self.page_size
+
+    def _append(self, rows):
+        self._loading = False
+        self._more_after = len(rows) >= self.page_size
+        if not rows:
+            return
+        self._add_page(rows, at_end=True)
+        if len(self._pages) > self.max_pages:
+            _, _, ids = self._pages.popleft()
+            self.tree.delete(*ids)
+            # The rows above the view vanished; scroll back so the same rows stay on screen
+            self.tree.yview_scroll(-len(ids), "units")
+            self._more_before = True
+
+    def _prepend(self, rows):
+        self._loading = False
+        self._more_before = len(rows) >= self.page_size
+        if not rows:
+            return
+        self._add_page(rows, at_end=False)
+        self.tree.yview_scroll(len(rows), "units")
+        if len(self._pages) > self.max_pages:
+            _, _, ids = self._pages.pop()
+            self.tree.delete(*ids)
+            self._more_after = True
+
+    def _on_yscroll(self, first, last):
+        self.vsb.set(first, last)
+        if self._loading or self.pager is None or not self._pages:
+            return
+        if float(last) >= 1 - self.EDGE and self._more_after:
+            self._request(self.pager.after, self._append, self._pages[-1][1])
+        elif float(first) <= self.EDGE and self._more_before:
+            self._request(self.pager.before, self._prepend, self._pages[0][0])
+
+
+class MedicinePicker(ttk.Frame):
+    """
+    Type-ahead medicine search: an entry over a short list of matches (id, name, MRP, stock).
+
+    Typing is debounced, then utils.suggest_medicines runs on a DB worker; each new keystroke
+    supersedes the query before it. With `lookup(term, limit)` (an in-memory index) matches
+    are shown on every keystroke instead, so a barcode scan followed by Enter picks its
+    product. Choosing a match (click, arrow keys, Enter) stores it in `.selected` and calls
+    `on_select(row)`.
+    """
+
+    DEBOUNCE_MS = 200
+
+    def __init__(self, master, on_select: Optional[Callable] = None, limit: int = 20, height: int = 6, width: int = 40,
+                 lookup: Optional[Callable] = None):
+        super().__init__(master)
+        self.on_select = on_select
+        self.lookup = lookup
+        self.limit = limit
+        self.selected = None
+        self._rows = {}       # Treeview item -> row
+        self._after_id = None
+        self._quiet = False   # set while the picker itself writes the entry text
+
+        self.var = tk.StringVar()
+        self.entry = ttk.Entry(self, textvariable=self.var, width=width)
+        self.entry.pack(fill=tk.X)
+        self.results = ttk.Treeview(self, columns=("id", "name", "mrp", "stock"), show="headings",
+                                    height=height, selectmode="browse")
+        for c, w, anchor in (("id", 80, "w"), ("name", 220, "w"), ("mrp", 80, "e"), ("stock", 60, "e")):
+            self.results.heading(c, text="MRP" if c == "mrp" else c.capitalize())
+            self.results.column(c, width=w, anchor=anchor, stretch=(c == "name"))
+        self.results.pack(fill=tk.BOTH, expand=True, pady=(2, 0))
+
+        self.var.trace_add("write", self._on_text)
+        self.entry.bind("<Down>", self._focus_results)
+        self.entry.bind("<Return>", self._choose_first)
+        self.results.bind("<<TreeviewSelect>>", self._on_pick)
+
+    def focus_set(self):
+        self.entry.focus_set()
+
+    def clear(self):
+        self._quiet = True
+        self.var.set("")
+        self._quiet = False
+        self.selected = None
+        self._show([])
+
+    # ---------- search ----------
+
+    def _on_text(self, *_):
+        if self._quiet:
+            return
+        self.selected = None
+        if self.lookup is not None:
+            return self._show(self.lookup(self.var.get(), self.limit))
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        self._after_id = self.after(self.DEBOUNCE_MS, self._search)
+
+    def _search(self):
+        self._after_id = None
+        term = self.var.get().strip()
+        if not term:
+            return self._show([])
+        run_async(suggest_medicines, term, self.limit, key=(self, "suggest"), widget=self.results,
+                  on_done=self._show,
+                  on_error=lambda e: messagebox.showerror("DB Error", str(e), parent=self.winfo_toplevel()))
+
+    def _show(self, rows):
+        self.results.delete(*self.results.get_children())
+        self._rows = {
+            self.results.insert("", tk.END, values=(r["id"], r["name"], format_currency(r["product_mrp"]), r["stock"])): r
+            for r in rows
+        }
+
+    # ---------- choosing ----------
+
+    def _focus_results(self, _evt=None):
+        items = self.results.get_children()
+        if items:
+            self.results.focus_set()
+            self.results.focus(items[0])
+            self.results.selection_set(items[0])
+        return "break"
+
+    def _choose_first(self, _evt=None):
+        items = self.results.get_children()
+        if items:
+            self.results.selection_set(items[0])
+        return "break"
+
+    def _on_pick(self, _evt=None):
+        sel = self.results.selection()
+        row = self._rows.get(sel[0]) if sel else None
+        if row is None:
+            return
+        self.selected = row
+        self._quiet = True
+        self.var.set(f"{row['id']} - {row['name']}")
+        self._quiet = False
+        if self.on_select:
+            self.on_select(row)
+
+
+def run_import(parent, kind: str, on_finished: Optional[Callable] = None):
+    """Ask for a CSV/JSON file and import it as `kind` (see importer.KINDS) on a DB worker, with a progress window."""
+    path = filedialog.askopenfilename(parent=parent, filetypes=[("CSV or JSON", "*.csv *.json *.jsonl"),
+                                                                ("All files", "*.*")])
+    if not path:
+        return
+    win = tk.Toplevel(parent)
+    win.title(f"Importing {kind}")
+    win.transient(parent)
+    frm = ttk.Frame(win, padding=12)
+    frm.pack(fill=tk.BOTH, expand=True)
+    bar = ttk.Progressbar(frm, length=320, maximum=1.0)
+    bar.pack(fill=tk.X)
+    status = ttk.Label(frm, text="Reading…")
+    status.pack(anchor="w", pady=(6, 0))
+
+    def show(counts):
+        bar["value"] = counts["fraction"]
+        status.config(text=f"{counts['read']:,} rows read, {counts['rejected']:,} rejected")
+
+    def done(result):
+        win.destroy()
+        text = f"Imported {result['imported']:,} of {result['read']:,} rows in {result['seconds']:.1f}s."
+        if result["reject_path"]:
+            text += f"\n{result['rejected']:,} rows were rejected; see {result['reject_path']}"
+        messagebox.showinfo("Import", text, parent=parent)
+        if on_finished:
+            on_finished()
+
+    def failed(exc):
+        win.destroy()
+        messagebox.showerror("Import", str(exc), parent=parent)
+
+    # Progress comes from the worker thread; post() hands it to the Tk thread
+    run_async(importer.import_file, kind, path, progress=lambda c: executor.post(show, c, widget=bar),
+              key=(parent, "import", kind), widget=parent, on_done=done, on_error=failed)
+
+
+def run_export(parent, name: str):
+    """Let the user pick columns and compression for exporter.EXPORTS[name], then export it on a DB worker."""
+    title, _, available = exporter.EXPORTS[name]
+    win = tk.Toplevel(parent)
+    win.title(f"Export {title}")
+    win.transient(parent)
+    frm = ttk.Frame(win, padding=12)
+    frm.pack(fill=tk.BOTH, expand=True)
+
+    ttk.Label(frm, text="Columns:").pack(anchor="w")
+    picked = {}
+    for column, header in available:
+        picked[column] = tk.BooleanVar(value=True)
+        ttk.Checkbutton(frm, text=header, variable=picked[column]).pack(anchor="w", padx=8)
+    gzip_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(frm, text="Compress (gzip)", variable=gzip_var).pack(anchor="w", pady=(8, 0))
+
+    bar = ttk.Progressbar(frm, length=320, maximum=1.0)
+    status = ttk.Label(frm, text="")
+    buttons = ttk.Frame(frm)
+    buttons.pack(fill=tk.X, pady=(10, 0))
+    stop = threading.Event()
+
+    def show(counts):
+        bar["value"] = counts["fraction"]
+        status.config(text=f"{counts['rows']:,} of {counts['total']:,} rows")
+
+    def done(result):
+        win.destroy()
+        if not result["cancelled"]:
+            messagebox.showinfo("Export", f"Exported {result['rows']:,} rows to {result['path']}", parent=parent)
+
+    def failed(exc):
+        win.destroy()
+        messagebox.showerror("Export", str(exc), parent=parent)
+
+    def start():
+        columns = [c for c, _ in available if picked[c].get()]
+        if not columns:
+            return messagebox.showerror("Export", "Select at least one column.", parent=win)
+        ext = ".csv.gz" if gzip_var.get() else ".csv"
+        path = filedialog.asksaveasfilename(parent=win, defaultextension=ext, initialfile=name + ext,
+                                            filetypes=[("CSV", "*" + ext)])
+        if not path:
+            return
+        export_btn.config(state="disabled")
+        bar.pack(fill=tk.X, pady=(10, 0), before=buttons)
+        status.pack(anchor="w", before=buttons)
+        run_async(exporter.export_csv, name, path, columns,
+                  progress=lambda c: executor.post(show, c, widget=bar), stop=stop,
+                  key=(parent, "export", name), widget=parent, on_done=done, on_error=failed)
+
+    def cancel():
+        # A running export stops at its next batch and removes its partial file
+        stop.set()
+        win.destroy()
+
+    ttk.Button(buttons, text="Cancel", command=cancel).pack(side=tk.RIGHT)
+    export_btn = ttk.Button(buttons, text="Export…", command=start)
+    export_btn.pack(side=tk.RIGHT, padx=4)
+    win.protocol("WM_DELETE_WINDOW", cancel)
@@ -0,0 +1,110 @@
+"""One live instance per window type, with recently closed windows kept warm for reuse.
+
+Windows are opened through WindowManager.show(name). Opening a window that is already up
+raises it; opening one that was closed recently re-shows the hidden instance. Either way
+its refresh() method, if it has one, reloads the data, and nothing is rebuilt. Closing a
+window (its own "Back to Main" button calls destroy()) only hides it, after calling its
+pause() method, if it has one, to stop its polling timers until refresh(). Past `warm_limit`
+hidden windows, the least recently closed one is really destroyed.
+"""
+import tkinter as tk
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Tuple
+
+from db_worker import executor
+
+WARM_LIMIT = 4
+
+
+class ManagedToplevel(tk.Toplevel):
+    """A Toplevel whose destroy() hands it back to its WindowManager instead of destroying it."""
+
+    def __init__(self, master, manager: "WindowManager", name: str):
+        super().__init__(master)
+        self.window_manager = manager
+        self.window_name = name
+
+    def destroy(self):
+        if self.window_manager is not None and self.window_manager.hide(self):
+            return
+        self.window_manager = None
+        super().destroy()
+
+
+class WindowManager:
+    def __init__(self, root, factory: Callable[[str], type], on_create: Callable[[tk.Toplevel], None] = None,
+                 warm_limit: int = WARM_LIMIT, single_use: Iterable[str] = ()):
+        """
+        factory(name) returns the window class, which is called as cls(toplevel, app).
+        on_create(toplevel) runs for every new toplevel (e.g. to set its close protocol).
+        Windows named in `single_use` are destroyed on close, never kept warm.
+        """
+        self.root = root
+        self.factory = factory
+        self.on_create = on_create
+        self.warm_limit = warm_limit
+        self.single_use = set(single_use)
+        self._visible: Dict[str, Tuple[ManagedToplevel, object]] = {}
+        self._warm: "OrderedDict[str, Tuple[ManagedToplevel, object]]" = OrderedDict()  # oldest first
+        self._closing = False
+
+    def show(self, name: str, app=None):
+        """Raise (or re-show) the window called `name`, creating it on first use. Returns the instance."""
+        if name in self._visible:
+            top, window = self._visible[name]
+        elif name in self._warm:
+            top, window = self._visible[name] = self._warm.pop(name)
+            top.deiconify()
+        else:
+            top = ManagedToplevel(self.root, self, name)
+            if self.on_create:
+                self.on_create(top)
+            cls = self.factory(name)
+            window = cls(top, app)
+            self._visible[name] = (top, window)
+            return window
+        top.lift()
+        top.focus_force()
+        refresh = getattr(window, "refresh", None)
+        if refresh is not None:
+            refresh()
+        return window
+
+    def hide(self, top: ManagedToplevel) -> bool:
+        """Called for a closing window; returns False if it should really be destroyed."""
+        entry = self._visible.pop(top.window_name, None)
+        if entry is None or entry[0] is not top:
+            # Already released, or a stale toplevel
+            return False
+        if self._closing or top.window_name in self.single_use or self.warm_limit <= 0:
+            self._release(entry)
+            return True
+        # A hidden window shouldn't keep polling the database; show() calls refresh() to resume
+        pause = getattr(entry[1], "pause", None)
+        if pause is not None:
+            pause()
+        # Dialogs opened from the window close with it, as they did when it was destroyed
+        for child in top.winfo_children():
+            if isinstance(child, tk.Toplevel):
+                child.destroy()
+        top.withdraw()
+        self._warm[top.window_name] = entry
+        while len(self._warm) > self.warm_limit:
+            _, oldest = self._warm.popitem(last=False)
+            self._release(oldest)
+        return True
+
+    def _release(self, entry):
+        top, _ = entry
+        # Results for its widgets would be dropped anyway; don't spend a worker on them
+        executor.cancel_within(top)
+        top.window_manager = None
+        top.destroy()
+
+    def close_all(self):
+        """Destroy every managed window, visible or warm (application shutdown)."""
+        self._closing = True
+        for entry in list(self._visible.values()) + list(self._warm.values()):
+            self._release(entry)
+        self._visible.clear()
+        self._warm.clear()